@@ -0,0 +1,203 @@
+import threading
+from itertools import chain
+from datetime import datetime, timedelta
+import numpy as np
+from flask import current_app
+from sqlalchemy import Integer, cast, func, select
+from models import db, Booking, ArchivedBooking, Service
+from tenancy import current_branch_id
+from representations import Encoded, dumps
+
+HOURS_PER_WEEK = 168
+WEEK_SECONDS = 7 * 24 * 3600
+# The Unix epoch fell on a Thursday; shift so hour 0 of the week is Monday 00:00
+EPOCH_WEEKDAY_OFFSET = 3 * 24
+# Weight of each older week in the seasonal average halves every HALF_LIFE_WEEKS
+HALF_LIFE_WEEKS = 4
+COUNTED_STATUSES = ("pending", "confirmed", "completed")
+
+
+def epoch_seconds(column):
+    """SQL expression for a naive UTC datetime column as Unix seconds"""
+    if db.engine.dialect.name == "postgresql":
+        return cast(func.extract("epoch", column), Integer)
+    return cast(func.strftime("%s", column), Integer)
+
+
+def load_history(start, end):
+    """Booking history as int64 columns: stylist, service, start (Unix seconds), duration (minutes).
+
+    One column-only query per table (live and archive), converted straight to
+    arrays; no ORM objects are built.
+    """
+    parts = []
+    branch_id = current_branch_id()
+    for model in (Booking, ArchivedBooking):
+        query = (
+            select(model.stylist_id, model.service_id, epoch_seconds(model.appointment_time), Service.duration_minutes)
+            .join(Service, Service.id == model.service_id)
+            .where(
+                model.appointment_time >= start,
+                model.appointment_time < end,
+                model.status.in_(COUNTED_STATUSES),
+            )
+        )
+        if branch_id is not None:
+            query = query.where(model.branch_id == branch_id)
+        # Executed on the connection (Core) rather than the ORM session: plain tuples, no ORM row processing,
+        # which is why the branch filter is spelled out above
+        rows = db.session.connection().execute(query).all()
+        if rows:
+            # fromiter over the flattened rows avoids numpy probing each Row for the array protocol
+            flat = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=len(rows) * 4)
+            parts.append(flat.reshape(-1, 4))
+    if not parts:
+        return np.empty((0, 4), dtype=np.int64)
+    return np.concatenate(parts)
+
+
+def hour_of_week(seconds):
+    return (seconds // 3600 + EPOCH_WEEKDAY_OFFSET) % HOURS_PER_WEEK
+
+
+def busy_minutes(starts, durations):
+    """Minutes each booking spends in its start hour and the hours after: (booking index, hour_of_week, minutes)"""
+    first_hour = starts // 3600
+    begin = starts / 60.0
+    end = begin + durations
+    rows, hours, minutes = [], [], []
+    # One vectorized pass per hour a booking can span, not per booking
+    for offset in range(int(durations.max(initial=0)) // 60 + 2):
+        hour = first_hour + offset
+        taken = np.clip(np.minimum(end, (hour + 1) * 60.0) - np.maximum(begin, hour * 60.0), 0, 60)
+        mask = taken > 0
+        rows.append(np.flatnonzero(mask))
+        hours.append((hour[mask] + EPOCH_WEEKDAY_OFFSET) % HOURS_PER_WEEK)
+        minutes.append(taken[mask])
+    return np.concatenate(rows), np.concatenate(hours), np.concatenate(minutes)
+
+
+def compute(today, history_weeks, horizon_weeks):
+    """Utilization and forecast matrices for the weeks before ``today``"""
+    end = datetime(today.year, today.month, today.day) - timedelta(days=today.weekday())  # this Monday
+    start = end - timedelta(weeks=history_weeks)
+    data = load_history(start, end)
+    stylists, services, starts, durations = data.T if len(data) else (np.empty(0, np.int64),) * 4
+
+    start_epoch = int((start - datetime(1970, 1, 1)).total_seconds())
+    weeks = (starts - start_epoch) // WEEK_SECONDS
+    hours = hour_of_week(starts)
+
+    # Demand: bookings per (stylist, service) pair, week and hour of week
+    pairs, pair_index = np.unique(np.stack([stylists, services], axis=1), axis=0, return_inverse=True)
+    pair_index = pair_index.reshape(-1)
+    counts = np.zeros((len(pairs), history_weeks, HOURS_PER_WEEK))
+    np.add.at(counts, (pair_index, weeks, hours), 1)
+
+    # Seasonal profile: exponentially weighted mean over weeks, newest weighted most
+    age = np.arange(history_weeks)[::-1]
+    weights = 0.5 ** (age / HALF_LIFE_WEEKS)
+    profile = np.tensordot(counts, weights / weights.sum(), axes=([1], [0]))
+
+    # Trend: least-squares line through each pair's weekly totals, extrapolated
+    # to the coming weeks relative to where the weighted profile sits on it
+    totals = counts.sum(axis=2)
+    x = np.arange(history_weeks) - (history_weeks - 1) / 2
+    mean = totals.mean(axis=1)
+    slope = (totals * x).sum(axis=1) / max((x ** 2).sum(), 1)
+    profile_x = (weights * x).sum() / weights.sum()
+    ahead = x[-1] + np.arange(1, horizon_weeks + 1)
+    base = mean + slope * profile_x
+    level = mean[:, None] + slope[:, None] * ahead[None, :]
+    factors = np.clip(np.divide(level, base[:, None], out=np.ones_like(level), where=base[:, None] > 0), 0, None)
+
+    # Utilization: share of each hour of week a stylist spends in appointments
+    stylist_ids, stylist_index = np.unique(stylists, return_inverse=True)
+    busy = np.zeros((len(stylist_ids), HOURS_PER_WEEK))
+    rows, busy_hours, minutes = busy_minutes(starts, durations)
+    np.add.at(busy, (stylist_index.reshape(-1)[rows], busy_hours), minutes)
+    utilization = busy / (60.0 * history_weeks)
+
+    return {
+        "start": start,
+        "end": end,
+        "pairs": pairs,
+        "profile": profile,
+        "factors": factors,
+        "stylist_ids": stylist_ids,
+        "utilization": utilization,
+        # Encoded responses per (stylist_id, service_id) filter, filled on first request
+        "encoded": {},
+    }
+
+
+class ForecastCache:
+    """Forecast matrices per (day, branch, history, horizon); recomputed once a day"""
+
+    def __init__(self):
+        self.entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, history_weeks, horizon_weeks):
+        today = datetime.utcnow().date()
+        key = (today, current_branch_id(), history_weeks, horizon_weeks)
+        entry = self.entries.get(key)
+        if entry is None:
+            with self._lock:
+                entry = self.entries.get(key)
+                if entry is None:
+                    entry = compute(today, history_weeks, horizon_weeks)
+                    # Keep only today's results
+                    self.entries = {k: v for k, v in self.entries.items() if k[0] == today}
+                    self.entries[key] = entry
+        return entry
+
+
+forecast_cache = ForecastCache()
+
+
+def forecast(horizon_weeks, stylist_id=None, service_id=None):
+    """Expected bookings per stylist/service and hour of week for the coming weeks, plus utilization.
+
+    Returned as an encoded JSON body; each filter combination is encoded once per cache entry.
+    """
+    history_weeks = current_app.config.get("ANALYTICS_HISTORY_WEEKS", 12)
+    entry = forecast_cache.get(history_weeks, horizon_weeks)
+    encoded = entry["encoded"].get((stylist_id, service_id))
+    if encoded is None:
+        encoded = entry["encoded"][(stylist_id, service_id)] = Encoded(dumps(_forecast(entry, horizon_weeks, stylist_id, service_id)))
+    return encoded
+
+
+def _forecast(entry, horizon_weeks, stylist_id, service_id):
+    pairs = entry["pairs"]
+    mask = np.ones(len(pairs), dtype=bool)
+    if stylist_id is not None:
+        mask &= pairs[:, 0] == stylist_id
+    if service_id is not None:
+        mask &= pairs[:, 1] == service_id
+
+    forecasts = []
+    for i in np.flatnonzero(mask):
+        forecasts.append({
+            "stylist_id": int(pairs[i, 0]),
+            "service_id": int(pairs[i, 1]),
+            "hour_of_week": np.round(entry["profile"][i], 3).tolist(),
+            "weekly_totals": np.round(entry["profile"][i].sum() * entry["factors"][i], 2).tolist(),
+        })
+
+    stylist_mask = np.ones(len(entry["stylist_ids"]), dtype=bool)
+    if stylist_id is not None:
+        stylist_mask &= entry["stylist_ids"] == stylist_id
+    utilization = [
+        {"stylist_id": int(entry["stylist_ids"][i]), "hour_of_week": np.round(entry["utilization"][i], 3).tolist()}
+        for i in np.flatnonzero(stylist_mask)
+    ]
+    return {
+        "history_from": entry["start"].isoformat(),
+        "history_to": entry["end"].isoformat(),
+        "forecast_from": entry["end"].isoformat(),
+        "horizon_weeks": horizon_weeks,
+        "forecast": forecasts,
+        "utilization": utilization,
+    }
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import bindparam, delete, func, insert, select, text, update
+from models import db, Booking, Customer, Notification, ArchivedBooking, ArchivedNotification
+
+ARCHIVABLE_STATUSES = ("completed", "cancelled")
+
+
+def archive_cutoff():
+    """Bookings before this instant may live in booking_archive"""
+    days = current_app.config.get("BOOKING_ARCHIVE_AFTER_DAYS", 365)
+    return datetime.utcnow() - timedelta(days=days)
+
+
+def needs_archive(start, status=None):
+    """True when a read beginning at ``start`` (None = unbounded) for ``status`` (None = any) can reach archived rows"""
+    if status is not None and status not in ARCHIVABLE_STATUSES:
+        return False  # only finished bookings are ever archived
+    return start is None or start < archive_cutoff()
+
+
+def merge_newest(queries, key, offset, limit):
+    """Page through several newest-first queries as if they were one"""
+    rows = []
+    for query in queries:
+        rows.extend(query.limit(offset + limit).all())
+    rows.sort(key=key, reverse=True)
+    return rows[offset:offset + limit]
+
+
+def ensure_partitions(first, last):
+    """Create yearly booking_archive partitions covering [first, last] (PostgreSQL only)"""
+    if db.engine.dialect.name != "postgresql":
+        return
+    for year in range(first.year, last.year + 1):
+        db.session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS booking_archive_{year} PARTITION OF booking_archive "
+            f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        ))
+    db.session.commit()
+
+
+def archive_bookings(before=None, batch_size=1000):
+    """Move finished bookings older than ``before`` and their notifications to the archive.
+
+    Each batch is copied with INSERT ... SELECT and removed with a bulk DELETE in
+    one transaction, so a booking is always in exactly one of the two tables.
+    Returns the number of bookings moved.
+    """
+    before = before or archive_cutoff()
+    candidates = (Booking.appointment_time < before) & Booking.status.in_(ARCHIVABLE_STATUSES)
+
+    first, last = db.session.execute(
+        select(func.min(Booking.appointment_time), func.max(Booking.appointment_time)).where(candidates)
+    ).one()
+    if first is None:
+        return 0
+    ensure_partitions(first, last)
+
+    bookings, archived_bookings = Booking.__table__, ArchivedBooking.__table__
+    notifications, archived_notifications = Notification.__table__, ArchivedNotification.__table__
+    booking_columns = [c.name for c in archived_bookings.c]
+    notification_columns = [c.name for c in archived_notifications.c]
+
+    moved = 0
+    while True:
+        ids = db.session.execute(
+            select(bookings.c.id).where(candidates).order_by(bookings.c.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            break
+
+        db.session.execute(insert(archived_bookings).from_select(
+            booking_columns,
+            select(*[bookings.c[name] for name in booking_columns]).where(bookings.c.id.in_(ids)),
+        ))
+        db.session.execute(insert(archived_notifications).from_select(
+            notification_columns,
+            select(*[notifications.c[name] for name in notification_columns])
+            .where(notifications.c.booking_id.in_(ids)),
+        ))
+        # The bulk DELETE skips the ORM listeners, so take archived unread notifications off the badge here
+        unread = db.session.execute(
+            select(notifications.c.customer_id, func.count())
+            .where(notifications.c.booking_id.in_(ids), notifications.c.status == "unread")
+            .group_by(notifications.c.customer_id)
+        ).all()
+        if unread:
+            customers = Customer.__table__
+            db.session.execute(
+                update(customers)
+                .where(customers.c.id == bindparam("customer"))
+                .values(unread_notifications=customers.c.unread_notifications - bindparam("count")),
+                [{"customer": customer_id, "count": count} for customer_id, count in unread],
+            )
+        db.session.execute(delete(notifications).where(notifications.c.booking_id.in_(ids)))
+        db.session.execute(delete(bookings).where(bookings.c.id.in_(ids)))
+        db.session.commit()
+        moved += len(ids)
+    return moved
@@ -0,0 +1,204 @@
+import random
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from models import db, Booking, Service, Stylist, stylist_service, ACTIVE_BOOKING_STATUSES
+from scheduling import LONGEST_SERVICE
+
+# Cost of a candidate placement, in minutes: the idle gap it leaves before
+# and after the new appointment, plus LOAD_WEIGHT per minute already booked
+# that day, so gaps are closed first and ties go to the less busy stylist.
+LOAD_WEIGHT = 0.25
+# A stylist with nothing before/after the slot counts as this much gap
+OPEN_GAP = 120
+
+
+def _fits(day, start, end):
+    """True when [start, end) overlaps none of ``day`` (sorted (start, end) tuples)"""
+    i = bisect_left(day, (start,))
+    if i > 0 and day[i - 1][1] > start:
+        return False
+    return i == len(day) or day[i][0] >= end
+
+
+def _cost(day, start, end, booked):
+    i = bisect_left(day, (start,))
+    before = start - day[i - 1][1] if i > 0 else OPEN_GAP
+    after = day[i][0] - end if i < len(day) else OPEN_GAP
+    return min(before, OPEN_GAP) + min(after, OPEN_GAP) + LOAD_WEIGHT * booked
+
+
+def best_stylist(start, end, candidates, schedule, booked):
+    """Cheapest free candidate for [start, end) (minutes), or None.
+
+    ``schedule`` maps stylist -> sorted intervals and ``booked`` stylist ->
+    minutes booked; both are updated by ``assign`` as it goes.
+    """
+    best, best_cost = None, None
+    for stylist_id in candidates:
+        day = schedule.setdefault(stylist_id, [])
+        if not _fits(day, start, end):
+            continue
+        cost = _cost(day, start, end, booked.get(stylist_id, 0))
+        if best_cost is None or cost < best_cost or (cost == best_cost and stylist_id < best):
+            best, best_cost = stylist_id, cost
+    return best
+
+
+def assign(jobs, qualified, schedule):
+    """Greedy interval partitioning: place jobs in start order on the best-fitting qualified stylist.
+
+    ``jobs`` are (key, start, end, service_id) with times in minutes,
+    ``qualified`` maps service_id -> stylist ids, ``schedule`` holds the
+    fixed intervals per stylist (mutated). Returns {key: stylist_id or None}.
+    """
+    booked = {s: sum(e - b for b, e in day) for s, day in schedule.items()}
+    result = {}
+    for key, start, end, service_id in sorted(jobs, key=lambda job: (job[1], job[2])):
+        stylist_id = best_stylist(start, end, qualified.get(service_id, ()), schedule, booked)
+        result[key] = stylist_id
+        if stylist_id is not None:
+            insort(schedule[stylist_id], (start, end))
+            booked[stylist_id] = booked.get(stylist_id, 0) + end - start
+    return result
+
+
+def _minutes(moment, day_start):
+    return int((moment - day_start).total_seconds() // 60)
+
+
+def day_schedule(day_start, stylist_ids, exclude=()):
+    """Sorted busy intervals (minutes from ``day_start``) of active bookings per stylist"""
+    schedule = {stylist_id: [] for stylist_id in stylist_ids}
+    for booking_id, stylist_id, moment, minutes in db.session.execute(
+        select(Booking.id, Booking.stylist_id, Booking.appointment_time, Service.duration_minutes)
+        .join(Service, Service.id == Booking.service_id)
+        .where(
+            Booking.stylist_id.in_(stylist_ids),
+            Booking.appointment_time > day_start - LONGEST_SERVICE,
+            Booking.appointment_time < day_start + timedelta(days=1) + LONGEST_SERVICE,
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+        )
+    ):
+        if booking_id in exclude:
+            continue
+        start = _minutes(moment, day_start)
+        schedule[stylist_id].append((start, start + minutes))
+    for day in schedule.values():
+        day.sort()
+    return schedule
+
+
+def qualified_stylists(service_ids):
+    """service_id -> ids of stylists (in the current branch) offering it"""
+    qualified = {}
+    for stylist_id, service_id in db.session.execute(
+        select(Stylist.id, stylist_service.c.service_id)
+        .join(stylist_service, stylist_service.c.stylist_id == Stylist.id)
+        .where(stylist_service.c.service_id.in_(service_ids))
+    ):
+        qualified.setdefault(service_id, []).append(stylist_id)
+    return qualified
+
+
+def choose_stylist(service, start):
+    """Stylist for an "any stylist" booking of ``service`` at ``start``, or None if nobody is free"""
+    candidates = qualified_stylists([service.id]).get(service.id, [])
+    if not candidates:
+        return None
+    day_start = datetime(start.year, start.month, start.day)
+    schedule = day_schedule(day_start, candidates)
+    booked = {s: sum(e - b for b, e in day) for s, day in schedule.items()}
+    begin = _minutes(start, day_start)
+    return best_stylist(begin, begin + service.duration_minutes, candidates, schedule, booked)
+
+
+def optimize_day(day, apply=True):
+    """Re-assign the day's "any stylist" bookings around the ones with a chosen stylist.
+
+    Returns (moved, unplaced): bookings given another stylist, and bookings
+    that fit nowhere (these keep their current stylist).
+    """
+    day_start = datetime(day.year, day.month, day.day)
+    movable = (
+        Booking.query
+        .filter(
+            Booking.auto_assigned.is_(True),
+            Booking.appointment_time >= day_start,
+            Booking.appointment_time < day_start + timedelta(days=1),
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+        )
+        .all()
+    )
+    if not movable:
+        return [], []
+    qualified = qualified_stylists({b.service_id for b in movable})
+    stylist_ids = {s for ids in qualified.values() for s in ids}
+    schedule = day_schedule(day_start, stylist_ids, exclude={b.id for b in movable})
+    jobs = []
+    for booking in movable:
+        start = _minutes(booking.appointment_time, day_start)
+        jobs.append((booking.id, start, start + booking.service.duration_minutes, booking.service_id))
+    result = assign(jobs, qualified, schedule)
+
+    moved = [b for b in movable if result[b.id] is not None and result[b.id] != b.stylist_id]
+    unplaced = [b for b in movable if result[b.id] is None]
+    if apply:
+        for booking in moved:
+            booking.stylist_id = result[booking.id]
+        db.session.commit()
+    return moved, unplaced
+
+
+def schedule_metrics(schedule):
+    """(idle minutes between appointments, busiest / average stylist load)"""
+    idle, loads = 0, []
+    for day in schedule.values():
+        loads.append(sum(e - b for b, e in day))
+        idle += sum(max(nxt[0] - prev[1], 0) for prev, nxt in zip(day, day[1:]))
+    average = sum(loads) / len(loads) if loads else 0
+    return idle, (max(loads) / average if average else 0)
+
+
+def benchmark(bookings=400, stylists=48, services=8, seed=7):
+    """Time ``assign`` on a synthetic day and compare it with customers picking any free qualified stylist"""
+    rng = random.Random(seed)
+    durations = [rng.choice((30, 45, 60, 90, 120)) for _ in range(services)]
+    qualified = {}
+    for s in range(stylists):
+        for service_id in rng.sample(range(services), rng.randint(2, services)):
+            qualified.setdefault(service_id, []).append(s)
+    offered = sorted(qualified)
+    jobs = []
+    for key in range(bookings):
+        service_id = rng.choice(offered)
+        start = 9 * 60 + rng.randrange(0, 10 * 60, 15)  # 09:00-19:00 in 15 minute steps
+        jobs.append((key, start, start + durations[service_id], service_id))
+
+    began = time.perf_counter()
+    optimized = {s: [] for s in range(stylists)}
+    result = assign(jobs, qualified, optimized)
+    elapsed = time.perf_counter() - began
+
+    picked = {s: [] for s in range(stylists)}
+    picked_placed = 0
+    for key, start, end, service_id in sorted(jobs, key=lambda job: job[1]):
+        free = [s for s in qualified[service_id] if _fits(picked[s], start, end)]
+        if free:
+            insort(picked[rng.choice(free)], (start, end))
+            picked_placed += 1
+
+    idle, load_ratio = schedule_metrics(optimized)
+    picked_idle, picked_load_ratio = schedule_metrics(picked)
+    return {
+        "bookings": bookings,
+        "stylists": stylists,
+        "seconds": elapsed,
+        "placed": sum(1 for s in result.values() if s is not None),
+        "picked_placed": picked_placed,
+        "idle_minutes": idle,
+        "picked_idle_minutes": picked_idle,
+        "load_ratio": load_ratio,
+        "picked_load_ratio": picked_load_ratio,
+    }
@@ -0,0 +1,216 @@
+import csv
+import gzip
+import multiprocessing
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import and_, func, or_, select, tuple_, update
+from models import db, Booking, ArchivedBooking, Customer, ExportJob, Payment, Service, Stylist
+
+EXPORT_BATCH = 5000
+DEFAULT_PERIOD = timedelta(days=365)
+
+
+class ExportError(ValueError):
+    pass
+
+
+def export_dir():
+    return current_app.config.get("EXPORT_DIR") or os.path.join(current_app.instance_path, "exports")
+
+
+def _period(params):
+    """(start, end) from the job's ISO "from"/"to", defaulting to the last year"""
+    try:
+        end = datetime.fromisoformat(params["to"]) if params.get("to") else datetime.utcnow()
+        start = datetime.fromisoformat(params["from"]) if params.get("from") else end - DEFAULT_PERIOD
+    except (TypeError, ValueError):
+        raise ExportError("Invalid datetime format. Use ISO format.")
+    # Stored times are naive UTC
+    start, end = (moment.astimezone(timezone.utc).replace(tzinfo=None) if moment.tzinfo else moment
+                  for moment in (start, end))
+    if end <= start:
+        raise ExportError("'to' must be after 'from'")
+    return start, end
+
+
+# Each source is a select whose first two columns (time, id) are the keyset it is paged by
+def _booking_sources(params, branch_id):
+    start, end = _period(params)
+    sources = []
+    for model in (Booking, ArchivedBooking):
+        query = (
+            select(
+                model.appointment_time, model.id, model.status, model.branch_id,
+                model.customer_id, Customer.name, model.stylist_id, Stylist.name,
+                model.service_id, Service.title, Service.price,
+            )
+            .outerjoin(Customer, Customer.id == model.customer_id)
+            .outerjoin(Stylist, Stylist.id == model.stylist_id)
+            .outerjoin(Service, Service.id == model.service_id)
+            .where(model.appointment_time >= start, model.appointment_time < end)
+        )
+        if branch_id is not None:
+            query = query.where(model.branch_id == branch_id)
+        sources.append((query, model.appointment_time, model.id))
+    return sources
+
+
+def _payment_sources(params, branch_id):
+    start, end = _period(params)
+    query = (
+        select(
+            Payment.created_at, Payment.id, Payment.booking_id, Payment.customer_id,
+            Payment.amount, Payment.method, Payment.status, Payment.transaction_id,
+        )
+        .where(Payment.created_at >= start, Payment.created_at < end)
+    )
+    if branch_id is not None:
+        # A payment belongs to its booking's branch, wherever the booking now lives
+        query = (
+            query
+            .outerjoin(Booking, Booking.id == Payment.booking_id)
+            .outerjoin(ArchivedBooking, ArchivedBooking.id == Payment.booking_id)
+            .where(func.coalesce(Booking.branch_id, ArchivedBooking.branch_id) == branch_id)
+        )
+    return [(query, Payment.created_at, Payment.id)]
+
+
+EXPORTS = {
+    "bookings": (
+        ("appointment_time", "id", "status", "branch_id", "customer_id", "customer", "stylist_id", "stylist",
+         "service_id", "service", "price"),
+        _booking_sources,
+    ),
+    "payments": (
+        ("created_at", "id", "booking_id", "customer_id", "amount", "method", "status", "transaction_id"),
+        _payment_sources,
+    ),
+}
+
+
+def validate(kind, params):
+    """Raise ExportError unless a job of ``kind`` with ``params`` can run"""
+    if not isinstance(kind, str) or kind not in EXPORTS:
+        raise ExportError(f"Unknown export '{kind}'; choose from {', '.join(EXPORTS)}")
+    _period(params)
+
+
+def _batches(query, time_column, id_column):
+    """Rows of ``query`` in keyset-ordered batches, each read in its own short transaction"""
+    last = None
+    while True:
+        page = query.order_by(time_column, id_column).limit(EXPORT_BATCH)
+        if last is not None:
+            page = page.where(tuple_(time_column, id_column) > last)
+        with db.engine.connect() as connection:
+            rows = connection.execute(page).all()
+        if not rows:
+            return
+        yield rows
+        last = tuple(rows[-1][:2])
+
+
+def _set(job_id, **values):
+    with db.engine.begin() as connection:
+        connection.execute(update(ExportJob.__table__).where(ExportJob.__table__.c.id == job_id).values(**values))
+
+
+def _claimable(now):
+    lease = timedelta(seconds=current_app.config.get("EXPORT_LEASE_SECONDS", 120))
+    table = ExportJob.__table__
+    return or_(
+        table.c.status == "queued",
+        # A worker that stopped heartbeating (crashed, killed) gives its job up
+        and_(table.c.status == "running", table.c.heartbeat_at < now - lease),
+    )
+
+
+def claim_job():
+    """Atomically take the next job for this worker; returns its id or None"""
+    table = ExportJob.__table__
+    now = datetime.utcnow()
+    with db.engine.begin() as connection:
+        job_id = connection.scalar(
+            select(table.c.id).where(_claimable(now)).order_by(table.c.id).limit(1).with_for_update(skip_locked=True)
+        )
+        if job_id is None:
+            return None
+        claimed = connection.execute(
+            update(table)
+            .where(table.c.id == job_id, _claimable(now))
+            .values(status="running", started_at=now, heartbeat_at=now, rows_written=0, error=None)
+        ).rowcount
+    return job_id if claimed else None
+
+
+def run_job(job_id):
+    """Write the job's rows to a gzipped CSV, reporting progress after every batch"""
+    job = db.session.get(ExportJob, job_id)
+    header, sources = EXPORTS[job.kind]
+    sources = sources(job.params, job.branch_id)
+    db.session.rollback()  # nothing is held open while the file is written
+    with db.engine.connect() as connection:
+        total = sum(connection.scalar(select(func.count()).select_from(query.subquery()))
+                    for query, _, _ in sources)
+    _set(job_id, rows_total=total)
+
+    os.makedirs(export_dir(), exist_ok=True)
+    path = os.path.join(export_dir(), f"{job.kind}-{job_id}.csv.gz")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    written = 0
+    try:
+        with gzip.open(tmp, "wt", newline="", compresslevel=6) as fh:
+            writer = csv.writer(fh)
+            writer.writerow(header)
+            for query, time_column, id_column in sources:
+                for rows in _batches(query, time_column, id_column):
+                    writer.writerows(rows)
+                    written += len(rows)
+                    _set(job_id, rows_written=written, heartbeat_at=datetime.utcnow())
+        os.replace(tmp, path)
+    except Exception as e:
+        current_app.logger.exception("Export %s failed", job_id)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        _set(job_id, status="failed", error=str(e)[:255], finished_at=datetime.utcnow())
+        return
+    _set(job_id, status="done", rows_written=written, rows_total=written, file_path=path,
+         finished_at=datetime.utcnow())
+
+
+def work(poll_seconds=2, once=False):
+    """Run jobs as they are queued; with ``once``, stop when the queue is empty. Returns jobs run."""
+    ran = 0
+    while True:
+        job_id = claim_job()
+        if job_id is None:
+            if once:
+                return ran
+            time.sleep(poll_seconds)
+            continue
+        run_job(job_id)
+        ran += 1
+
+
+def _worker_process(poll_seconds):
+    # Each worker builds its own app, so no connection or thread is shared with the parent
+    from app import app
+    with app.app_context():
+        work(poll_seconds)
+
+
+def start_workers(processes, poll_seconds=2):
+    """Run ``processes`` export workers until interrupted"""
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_worker_process, args=(poll_seconds,), name=f"export-worker-{i}")
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
@@ -0,0 +1,112 @@
+from flask import request
+from flask_restx import abort, fields, marshal
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, lazyload, load_only, selectinload
+
+FIELDS_HELP = "Comma separated fields to return, nested with dots (e.g. id,service.title)"
+
+
+class FieldsetError(ValueError):
+    pass
+
+
+def parse_fields(raw):
+    """Turn "id,service.title" into {"id": {}, "service": {"title": {}}}"""
+    tree = {}
+    for path in raw.split(","):
+        path = path.strip()
+        if not path:
+            continue
+        node = tree
+        for part in path.split("."):
+            node = node.setdefault(part, {})
+    return tree
+
+
+def select_fields(model, tree):
+    """Reduce a marshalling model to the requested fields"""
+    selected = {}
+    for name, sub in tree.items():
+        if name not in model:
+            raise FieldsetError(f"Unknown field '{name}'")
+        field = model[name]
+        container = field.container if isinstance(field, fields.List) else field
+        if not sub:
+            selected[name] = field
+        elif isinstance(container, fields.Nested):
+            nested = fields.Nested(select_fields(container.nested, sub))
+            selected[name] = fields.List(nested) if isinstance(field, fields.List) else nested
+        else:
+            raise FieldsetError(f"Field '{name}' has no sub-fields")
+    return selected
+
+
+def load_options(entity, tree):
+    """Loader options fetching only the requested columns and relationships"""
+    mapper = inspect(entity)
+    columns = [getattr(entity, col.key) for col in mapper.primary_key]
+    options = []
+    for name, sub in tree.items():
+        if name in mapper.relationships:
+            rel = mapper.relationships[name]
+            loader = selectinload if rel.uselist else joinedload
+            option = loader(getattr(entity, name))
+            if sub:
+                option = option.options(*load_options(rel.mapper.class_, sub))
+            options.append(option)
+        elif name in mapper.column_attrs:
+            columns.append(getattr(entity, name))
+    # Relationships nobody asked for (e.g. eager backrefs) stay unloaded
+    return [load_only(*columns), lazyload("*")] + options
+
+
+def relationship_options(entity, model):
+    """Eager loaders for every relationship ``model`` marshals, so a full response is not N+1"""
+    mapper = inspect(entity)
+    options = []
+    for name, field in model.items():
+        container = field.container if isinstance(field, fields.List) else field
+        if not isinstance(container, fields.Nested) or name not in mapper.relationships:
+            continue
+        rel = mapper.relationships[name]
+        loader = selectinload if rel.uselist else joinedload
+        options.append(loader(getattr(entity, name)).options(*relationship_options(rel.mapper.class_, container.nested)))
+    # Eager backrefs the model does not marshal stay unloaded
+    return [lazyload("*")] + options
+
+
+def sparse_fields(model):
+    """Reduced model and field tree for the ``fields`` query parameter (tree is None when absent)"""
+    raw = request.args.get("fields")
+    if not raw:
+        return model, None
+    try:
+        tree = parse_fields(raw)
+        return select_fields(model, tree), tree
+    except FieldsetError as e:
+        abort(400, str(e))
+
+
+def sparse_options(entity, tree, always=(), model=None):
+    """Loader options for ``tree``; ``always`` names columns needed besides the requested ones.
+
+    Without a tree (no ``fields`` parameter) every relationship of ``model`` is loaded eagerly.
+    """
+    if tree is None:
+        return relationship_options(entity, model) if model is not None else []
+    tree = dict(tree)
+    for name in always:
+        tree.setdefault(name, {})
+    return load_options(entity, tree)
+
+
+def marshal_sparse(query, model, one=False):
+    """Marshal ``query`` honouring the ``fields`` query parameter.
+
+    The requested fields are pushed down into the SQL through ``load_only``
+    and relationship loaders, and the response is marshalled with a reduced
+    model, so unrequested columns are neither fetched nor serialized.
+    """
+    model, tree = sparse_fields(model)
+    query = query.options(*sparse_options(query.column_descriptions[0]["entity"], tree, model=model))
+    return marshal(query.first_or_404() if one else query.all(), model)
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from models import db, LeaderboardBucket, Service, Stylist, add_to_buckets
+
+# Minute buckets are kept long enough for the "hour" window, hour buckets for the "day" window
+MINUTE_RETENTION = timedelta(hours=2)
+HOUR_RETENTION = timedelta(days=2)
+ROLLUPS = (("minute", "hour", MINUTE_RETENTION), ("hour", "day", HOUR_RETENTION))
+
+# window: (span, precision its start is rounded down to); "today" starts at midnight UTC
+WINDOWS = {
+    "hour": (timedelta(hours=1), "minute"),
+    "today": (timedelta(0), "day"),
+    "day": (timedelta(days=1), "hour"),
+    "week": (timedelta(days=7), "day"),
+    "month": (timedelta(days=30), "day"),
+}
+SUBJECTS = {"stylist": (Stylist, Stylist.name), "service": (Service, Service.title)}
+SORTS = ("bookings", "revenue")
+
+
+def truncate(moment, granularity):
+    moment = moment.replace(second=0, microsecond=0)
+    if granularity in ("hour", "day"):
+        moment = moment.replace(minute=0)
+    if granularity == "day":
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def window_start(window, now=None):
+    span, precision = WINDOWS[window]
+    return truncate((now or datetime.utcnow()) - span, precision)
+
+
+def compact(now=None):
+    """Roll old minute buckets into hours and old hour buckets into days; returns buckets rolled per granularity.
+
+    A bucket is only rolled up once its whole coarser bucket is past retention,
+    so every window still starts on a boundary of the buckets it reads.
+    """
+    now = now or datetime.utcnow()
+    table = LeaderboardBucket.__table__
+    connection = db.session.connection()
+    rolled = {}
+    for finer, coarser, retention in ROLLUPS:
+        old = (table.c.granularity == finer, table.c.bucket_start < truncate(now - retention, coarser))
+        totals = {}
+        rows = connection.execute(
+            select(table.c.dimension, table.c.subject_id, table.c.branch_id, table.c.bucket_start,
+                   table.c.bookings, table.c.revenue).where(*old)
+        ).all()
+        for row in rows:
+            key = (row.dimension, row.subject_id, truncate(row.bucket_start, coarser))
+            bookings, revenue, _ = totals.get(key, (0, 0, None))
+            totals[key] = (bookings + row.bookings, revenue + row.revenue, row.branch_id)
+        add_to_buckets(connection, [
+            {"dimension": dimension, "bucket_start": start, "granularity": coarser, "subject_id": subject_id,
+             "branch_id": branch_id, "bookings": bookings, "revenue": revenue}
+            for (dimension, subject_id, start), (bookings, revenue, branch_id) in totals.items()
+        ])
+        connection.execute(table.delete().where(*old))
+        rolled[finer] = len(rows)
+    db.session.commit()
+    return rolled
+
+
+def top(window, by="stylist", sort="bookings", limit=10, now=None):
+    """Leaders of the window read from the buckets alone: [{"id", "name", "bookings", "revenue"}]"""
+    model, name = SUBJECTS[by]
+    bookings = func.sum(LeaderboardBucket.bookings).label("bookings")
+    revenue = func.sum(LeaderboardBucket.revenue).label("revenue")
+    rows = db.session.execute(
+        select(LeaderboardBucket.subject_id, bookings, revenue)
+        .where(LeaderboardBucket.dimension == by, LeaderboardBucket.bucket_start >= window_start(window, now))
+        .group_by(LeaderboardBucket.subject_id)
+        .order_by((bookings if sort == "bookings" else revenue).desc(), LeaderboardBucket.subject_id)
+        .limit(limit)
+    ).all()
+    names = dict(db.session.execute(
+        select(model.id, name).where(model.id.in_([row.subject_id for row in rows]))
+    ).all()) if rows else {}
+    return [
+        {"id": row.subject_id, "name": names.get(row.subject_id), "bookings": row.bookings,
+         "revenue": round(row.revenue, 2)}
+        for row in rows
+    ]
@@ -0,0 +1,196 @@
+import http.client
+import itertools
+import json
+import logging
+import multiprocessing
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+from flask_jwt_extended import create_access_token
+from sqlalchemy import select
+from werkzeug.serving import make_server
+from models import db, Customer, Service, Stylist
+from overload import CATALOG_NAMESPACES
+
+# Far enough ahead that the slots are free and never collide with real bookings
+FIRST_SLOT = datetime(2099, 1, 5, 9, 0)
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Traffic:
+    """Requests of one priority class; ``next()`` gives (method, path, body)"""
+
+    def __init__(self, name, requests):
+        self.name = name
+        self.requests = requests
+
+    def next(self, rng):
+        method, path, body = rng.choice(self.requests)
+        return method, path, body() if callable(body) else body
+
+
+def scenario():
+    """Booking creation (critical), catalog browsing (normal) and reporting (low) against the seeded rows"""
+    customer = db.session.scalar(select(Customer.id).order_by(Customer.id))
+    services = db.session.scalars(select(Service.id)).all()
+    stylists = db.session.scalars(select(Stylist.id)).all()
+    if not customer or not services or not stylists:
+        raise RuntimeError("The database is empty; run with --seed on an empty database first")
+    slots = itertools.count()
+    lock = threading.Lock()
+
+    def booking():
+        with lock:
+            slot = next(slots)
+        # One slot every 90 minutes, 8 a day, so consecutive bookings never overlap
+        moment = FIRST_SLOT + timedelta(days=slot // 8, minutes=90 * (slot % 8))
+        return {"customer_id": customer, "service_id": services[slot % len(services)],
+                "appointment_time": moment.isoformat()}
+
+    critical = Traffic("critical", [("POST", "/bookings/", booking)])
+    normal = Traffic("normal", [
+        ("GET", "/services/", None),
+        ("GET", "/stylists/", None),
+        *[("GET", f"/stylists/{stylist}", None) for stylist in stylists[:5]],
+        *[("GET", f"/services/{service}/stylists", None) for service in services[:5]],
+        ("GET", "/bookings/?status=pending&sort=appointment_time", None),
+    ])
+    low = Traffic("low", [
+        ("GET", "/analytics/forecast", None),
+        ("GET", "/changes?after=0&limit=1000", None),
+        ("GET", "/leaderboard?window=month", None),
+    ])
+    return critical, normal, low
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, status):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(seconds)
+            counts = self.statuses.setdefault(name, {})
+            counts[status] = counts.get(status, 0) + 1
+
+    def summary(self):
+        return {
+            name: {
+                "requests": len(samples),
+                "p50_ms": percentile(samples, 0.5) * 1000,
+                "p99_ms": percentile(samples, 0.99) * 1000,
+                "statuses": dict(sorted(self.statuses[name].items(), key=lambda item: str(item[0]))),
+            }
+            for name, samples in sorted(self.latencies.items())
+        }
+
+
+def _client(base_url, headers, traffic, recorder, stop, seed, pause):
+    rng = random.Random(seed)
+    parts = urlsplit(base_url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=30)
+    # Shoppers browse the catalog without signing in
+    anonymous = {name: value for name, value in headers.items() if name != "Authorization"}
+    while not stop.is_set():
+        method, path, body = traffic.next(rng)
+        payload = json.dumps(body) if body is not None else None
+        public = path.strip("/").split("/", 1)[0] in CATALOG_NAMESPACES
+        began = time.perf_counter()
+        try:
+            connection.request(method, parts.path.rstrip("/") + path, payload, anonymous if public else headers)
+            response = connection.getresponse()
+            response.read()
+            status = "stale" if response.getheader("X-Cache") == "stale" else response.status
+            retry_after = float(response.getheader("Retry-After") or 0) if status == 503 else 0
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            status, retry_after = "error", 0
+        recorder.add(traffic.name, time.perf_counter() - began, status)
+        # Well-behaved clients back off as told; shedding only helps if they do
+        if retry_after or pause:
+            stop.wait(retry_after or pause)
+
+
+def run_phase(base_url, headers, load, seconds):
+    """Drive ``load`` ([(traffic, clients, pause)]) for ``seconds``; returns per-class latency summaries"""
+    recorder, stop = Recorder(), threading.Event()
+    threads = [
+        threading.Thread(target=_client, args=(base_url, headers, traffic, recorder, stop, i, pause), daemon=True)
+        for traffic, clients, pause in load
+        for i in range(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return recorder.summary()
+
+
+def _serve(shedding, ready):
+    # A process of its own, so the load generator does not compete with the server for the GIL
+    from app import app
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    # Booking creation is measured here, not its per-IP rate limit
+    app.config.update(OVERLOAD_ENABLED=shedding, RATELIMIT_ENABLED=False)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    ready.put(server.server_port)
+    server.serve_forever()
+
+
+@contextmanager
+def serving(shedding):
+    """Base URL of this app served by a local child process"""
+    context = multiprocessing.get_context("spawn")
+    ready = context.Queue()
+    process = context.Process(target=_serve, args=(shedding, ready), daemon=True)
+    process.start()
+    try:
+        yield f"http://127.0.0.1:{ready.get(timeout=60)}"
+    finally:
+        process.terminate()
+        process.join()
+
+
+def run(base_url=None, clients=32, critical_clients=4, seconds=10):
+    """Booking creation in normal traffic, then under a flood of browsing and reporting; [(phase, summary)].
+
+    Without ``base_url`` the app is served by a local child process, once with
+    load shedding and once without, for comparison. Bookings are created in
+    the database; use a scratch one.
+    """
+    critical, normal, low = scenario()
+    admin = db.session.scalar(select(Customer.id).where(Customer.is_admin.is_(True)).order_by(Customer.id))
+    if admin is None:
+        raise RuntimeError("An admin customer is needed to call the reporting endpoints")
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(admin))}",
+               "Content-Type": "application/json"}
+    db.session.rollback()
+
+    bookings = [(critical, critical_clients, 0.02)]
+    # A normal day first, so every endpoint's no-load latency is known before the spike
+    phases = (
+        ("normal traffic", bookings + [(normal, 1, 0.05), (low, 1, 0.2)]),
+        ("flood", bookings + [(normal, clients // 2, 0), (low, clients - clients // 2, 0)]),
+    )
+    if base_url is not None:
+        return [(name, run_phase(base_url, headers, load, seconds)) for name, load in phases]
+    results = []
+    for shedding in (True, False):
+        with serving(shedding) as url:
+            for name, load in phases:
+                results.append((f"{name}, shedding {'on' if shedding else 'off'}",
+                                run_phase(url, headers, load, seconds)))
+    return results
@@ -0,0 +1,87 @@
+"""sync tracking
+
+Revision ID: 27e0974e8db2
+Revises: a96c941070c0
+Create Date: 2026-10-19 02:35:22.759617
+
+"""
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '27e0974e8db2'
+down_revision = 'a96c941070c0'
+branch_labels = None
+depends_on = None
+
+
+SYNCED_TABLES = ('branch', 'customer', 'service', 'stylist', 'booking')
+
+
+def upgrade():
+    op.create_table('tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=30), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('branch_id', sa.Integer(), nullable=True),
+    sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.create_index('ix_tombstone_deleted_at', ['deleted_at'], unique=False)
+
+    # Existing rows count as changed now, so the first pull sends them
+    now = datetime.utcnow()
+    for table in SYNCED_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(sa.text(f"UPDATE {table} SET updated_at = :now").bindparams(now=now))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('client_ref', sa.String(length=36), nullable=True))
+        batch_op.create_index('ix_booking_branch_updated', ['branch_id', 'updated_at'], unique=False)
+        batch_op.create_unique_constraint('uq_booking_client_ref', ['client_ref'])
+
+    with op.batch_alter_table('branch', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_branch_updated_at'), ['updated_at'], unique=False)
+
+    with op.batch_alter_table('customer', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_customer_updated_at'), ['updated_at'], unique=False)
+
+    with op.batch_alter_table('service', schema=None) as batch_op:
+        batch_op.create_index('ix_service_branch_updated', ['branch_id', 'updated_at'], unique=False)
+
+    with op.batch_alter_table('stylist', schema=None) as batch_op:
+        batch_op.create_index('ix_stylist_branch_updated', ['branch_id', 'updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('stylist', schema=None) as batch_op:
+        batch_op.drop_index('ix_stylist_branch_updated')
+
+    with op.batch_alter_table('service', schema=None) as batch_op:
+        batch_op.drop_index('ix_service_branch_updated')
+
+    with op.batch_alter_table('customer', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_customer_updated_at'))
+
+    with op.batch_alter_table('branch', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_branch_updated_at'))
+
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_booking_client_ref', type_='unique')
+        batch_op.drop_index('ix_booking_branch_updated')
+        batch_op.drop_column('client_ref')
+
+    for table in SYNCED_TABLES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('tombstone', schema=None) as batch_op:
+        batch_op.drop_index('ix_tombstone_deleted_at')
+
+    op.drop_table('tombstone')
@@ -0,0 +1,77 @@
+"""branches
+
+Revision ID: a96c941070c0
+Revises: 3388c8302eca
+Create Date: 2026-10-19 02:33:04.880483
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a96c941070c0'
+down_revision = '3388c8302eca'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('branch',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('address', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    # Existing data becomes the first branch (tenancy.DEFAULT_BRANCH_ID)
+    op.execute("INSERT INTO branch (id, name) VALUES (1, 'Main')")
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("SELECT setval('branch_id_seq', 1)")
+
+    for table in ('booking', 'booking_archive', 'service', 'stylist'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('branch_id', sa.Integer(), server_default='1', nullable=False))
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('branch_id', server_default=None)
+
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.create_index('ix_booking_branch_status_time', ['branch_id', 'status', 'appointment_time'], unique=False)
+        batch_op.create_index('ix_booking_branch_time', ['branch_id', 'appointment_time'], unique=False)
+        batch_op.create_foreign_key('fk_booking_branch_id_branch', 'branch', ['branch_id'], ['id'])
+
+    with op.batch_alter_table('booking_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_booking_archive_branch_time', ['branch_id', 'appointment_time'], unique=False)
+
+    with op.batch_alter_table('service', schema=None) as batch_op:
+        batch_op.create_index('ix_service_branch_title', ['branch_id', 'title'], unique=False)
+        batch_op.create_foreign_key('fk_service_branch_id_branch', 'branch', ['branch_id'], ['id'])
+
+    with op.batch_alter_table('stylist', schema=None) as batch_op:
+        batch_op.create_index('ix_stylist_branch_name', ['branch_id', 'name'], unique=False)
+        batch_op.create_foreign_key('fk_stylist_branch_id_branch', 'branch', ['branch_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('stylist', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_stylist_branch_id_branch', type_='foreignkey')
+        batch_op.drop_index('ix_stylist_branch_name')
+        batch_op.drop_column('branch_id')
+
+    with op.batch_alter_table('service', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_service_branch_id_branch', type_='foreignkey')
+        batch_op.drop_index('ix_service_branch_title')
+        batch_op.drop_column('branch_id')
+
+    with op.batch_alter_table('booking_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_booking_archive_branch_time')
+        batch_op.drop_column('branch_id')
+
+    with op.batch_alter_table('booking', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_booking_branch_id_branch', type_='foreignkey')
+        batch_op.drop_index('ix_booking_branch_time')
+        batch_op.drop_index('ix_booking_branch_status_time')
+        batch_op.drop_column('branch_id')
+
+    op.drop_table('branch')
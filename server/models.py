@@ -1,16 +1,38 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import with_loader_criteria
 from sqlalchemy_serializer import SerializerMixin
 from datetime import datetime
+from tenancy import BranchSession, current_branch_id, default_branch_id
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": BranchSession})
 
 # Association table for many-to-many relationship between Stylists and Services
 stylist_service = db.Table(
     "stylist_service",
     db.Column("stylist_id", db.Integer, db.ForeignKey("stylist.id"), primary_key=True),
-    db.Column("service_id", db.Integer, db.ForeignKey("service.id"), primary_key=True)
+    db.Column("service_id", db.Integer, db.ForeignKey("service.id"), primary_key=True),
+    db.Index("ix_stylist_service_service", "service_id")
 )
 
+# ----------------- BRANCH -----------------
+class Branch(db.Model, SerializerMixin):
+    __tablename__ = "branch"
+    serialize_only = ("id", "name", "address")
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    address = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+
+class BranchScoped:
+    """Models whose reads are limited to the request's branch (see BRANCH SCOPING)"""
+    # Subclasses redeclare it (with a foreign key where they have one)
+    branch_id = db.Column(db.Integer, nullable=False)
+
 # ----------------- CUSTOMER -----------------
 class Customer(db.Model, SerializerMixin):
     __tablename__ = "customer"
@@ -19,7 +41,8 @@ class Customer(db.Model, SerializerMixin):
         "-bookings.stylist", 
         "-bookings.service",
         "-payments.customer",
-        "-notifications.customer"
+        "-notifications.customer",
+        "-waitlist"
     )
 
     id = db.Column(db.Integer, primary_key=True)
@@ -27,6 +50,15 @@ class Customer(db.Model, SerializerMixin):
     phone = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)
+    is_disabled = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    # Maintained by the booking/payment/notification listeners at the bottom of this module
+    total_bookings = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    completed_bookings = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    cancelled_bookings = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    lifetime_spend = db.Column(db.Float, nullable=False, default=0, server_default="0")
+    unread_notifications = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     bookings = db.relationship(
         "Booking",
@@ -47,8 +79,12 @@ class Customer(db.Model, SerializerMixin):
     )
 
 # ----------------- SERVICE -----------------
-class Service(db.Model, SerializerMixin):
+class Service(db.Model, SerializerMixin, BranchScoped):
     __tablename__ = "service"
+    __table_args__ = (
+        db.Index("ix_service_branch_title", "branch_id", "title"),
+        db.Index("ix_service_branch_updated", "branch_id", "updated_at"),
+    )
     serialize_rules = (
         "-stylists.services", 
         "-bookings.service", 
@@ -60,10 +96,17 @@ class Service(db.Model, SerializerMixin):
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.String(255), nullable=True)
     price = db.Column(db.Float, nullable=False)
+    duration_minutes = db.Column(db.Integer, nullable=False, default=60, server_default="60")
+    branch_id = db.Column(db.Integer, db.ForeignKey("branch.id"), nullable=False, default=default_branch_id)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
 # ----------------- STYLIST -----------------
-class Stylist(db.Model, SerializerMixin):
+class Stylist(db.Model, SerializerMixin, BranchScoped):
     __tablename__ = "stylist"
+    __table_args__ = (
+        db.Index("ix_stylist_branch_name", "branch_id", "name"),
+        db.Index("ix_stylist_branch_updated", "branch_id", "updated_at"),
+    )
     serialize_rules = (
         "-services.stylists", 
         "-bookings.stylist", 
@@ -76,6 +119,8 @@ class Stylist(db.Model, SerializerMixin):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     bio = db.Column(db.String(255), nullable=True)
+    branch_id = db.Column(db.Integer, db.ForeignKey("branch.id"), nullable=False, default=default_branch_id)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # also bumped when services change
 
     services = db.relationship(
         "Service",
@@ -102,7 +147,7 @@ class Stylist(db.Model, SerializerMixin):
     )
 
 # ----------------- BOOKING -----------------
-class Booking(db.Model, SerializerMixin):
+class Booking(db.Model, SerializerMixin, BranchScoped):
     __tablename__ = "booking"
     serialize_rules = (
         "-customer.bookings", 
@@ -111,10 +156,27 @@ class Booking(db.Model, SerializerMixin):
         "-payment.booking",
         "-notifications.booking"
     )
+    # Every supported filter/sort combination on the booking list is served by one of these
+    __table_args__ = (
+        db.Index("ix_booking_appointment_time", "appointment_time"),
+        db.Index("ix_booking_stylist_time", "stylist_id", "appointment_time"),
+        db.Index("ix_booking_customer_time", "customer_id", "appointment_time"),
+        db.Index("ix_booking_status_time", "status", "appointment_time"),
+        db.Index("ix_booking_branch_time", "branch_id", "appointment_time"),
+        db.Index("ix_booking_branch_status_time", "branch_id", "status", "appointment_time"),
+        db.Index("ix_booking_branch_updated", "branch_id", "updated_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     appointment_time = db.Column(db.DateTime, nullable=False)
     status = db.Column(db.String(20), default="pending")  # pending, confirmed, completed, cancelled
+    branch_id = db.Column(db.Integer, db.ForeignKey("branch.id"), nullable=False)  # the stylist's branch
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    client_ref = db.Column(db.String(36), unique=True, nullable=True)  # id given by the kiosk that created it
+    # When it was taken, for the leaderboard; None for bookings that predate the column
+    created_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)
+    # Booked for "any stylist": the server picked the stylist and may move it when re-optimizing the day
+    auto_assigned = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
     customer_id = db.Column(db.Integer, db.ForeignKey("customer.id"), nullable=False)
     customer = db.relationship("Customer", back_populates="bookings")
@@ -125,7 +187,12 @@ class Booking(db.Model, SerializerMixin):
     service_id = db.Column(db.Integer, db.ForeignKey("service.id"), nullable=False)
     service = db.relationship("Service", backref="bookings")
 
-    payment = db.relationship("Payment", back_populates="booking", uselist=False)
+    payment = db.relationship(
+        "Payment",
+        primaryjoin="Booking.id == foreign(Payment.booking_id)",
+        back_populates="booking",
+        uselist=False
+    )
     notifications = db.relationship("Notification", back_populates="booking", cascade="all, delete-orphan")
 
 # ----------------- PAYMENT -----------------
@@ -134,7 +201,8 @@ class Payment(db.Model, SerializerMixin):
     serialize_rules = ("-customer.payments", "-booking.payment")
 
     id = db.Column(db.Integer, primary_key=True)
-    booking_id = db.Column(db.Integer, db.ForeignKey("booking.id"), unique=True)
+    # No FK: the booking may have been moved to booking_archive (same id)
+    booking_id = db.Column(db.Integer, unique=True)
     customer_id = db.Column(db.Integer, db.ForeignKey("customer.id"), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     method = db.Column(db.String(50), nullable=False)  # mpesa, card, paypal, cash
@@ -142,13 +210,20 @@ class Payment(db.Model, SerializerMixin):
     transaction_id = db.Column(db.String(120), unique=True, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    booking = db.relationship("Booking", back_populates="payment")
+    booking = db.relationship(
+        "Booking",
+        primaryjoin="foreign(Payment.booking_id) == Booking.id",
+        back_populates="payment"
+    )
     customer = db.relationship("Customer", back_populates="payments")
 
 # ----------------- NOTIFICATION -----------------
 class Notification(db.Model, SerializerMixin):
     __tablename__ = "notification"
     serialize_rules = ("-customer.notifications", "-booking.notifications")
+    __table_args__ = (
+        db.Index("ix_notification_customer_time", "customer_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     message = db.Column(db.String(255), nullable=False)
@@ -166,9 +241,13 @@ class Notification(db.Model, SerializerMixin):
 class Portfolio(db.Model, SerializerMixin):
     __tablename__ = "portfolio"
     serialize_rules = ("-stylist.portfolio",)
+    __table_args__ = (
+        db.Index("ix_portfolio_stylist_created", "stylist_id", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     image_url = db.Column(db.String(255), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=True)  # sha256 of the upload, names its thumbnails
     description = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
@@ -189,3 +268,519 @@ class Review(db.Model, SerializerMixin):
     stylist = db.relationship("Stylist", back_populates="reviews")
 
     customer_id = db.Column(db.Integer, db.ForeignKey("customer.id"), nullable=False)
+
+# ----------------- WAITLIST -----------------
+class WaitlistEntry(db.Model, SerializerMixin):
+    __tablename__ = "waitlist_entry"
+    serialize_only = (
+        "id", "customer_id", "service_id", "stylist_id", "window_start", "window_end", "status",
+        "created_at", "offered_stylist_id", "offered_time", "offer_expires_at", "booking_id"
+    )
+    # The matcher looks up the oldest waiting entry per stylist (or "any stylist"
+    # per service) whose window contains the freed start time; customers list theirs newest first
+    __table_args__ = (
+        db.Index("ix_waitlist_stylist_window", "stylist_id", "status", "window_start"),
+        db.Index("ix_waitlist_service_window", "service_id", "status", "window_start"),
+        db.Index("ix_waitlist_customer_created", "customer_id", "created_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey("customer.id"), nullable=False)
+    service_id = db.Column(db.Integer, db.ForeignKey("service.id"), nullable=False)
+    stylist_id = db.Column(db.Integer, db.ForeignKey("stylist.id"), nullable=True)  # None = any stylist
+    window_start = db.Column(db.DateTime, nullable=False)  # acceptable appointment start times
+    window_end = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="waiting")  # waiting, offered, booked, expired, cancelled
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    offered_stylist_id = db.Column(db.Integer, db.ForeignKey("stylist.id"), nullable=True)
+    offered_time = db.Column(db.DateTime, nullable=True)
+    offer_expires_at = db.Column(db.DateTime, nullable=True, index=True)
+    booking_id = db.Column(db.Integer, nullable=True)
+
+    customer = db.relationship("Customer", backref=db.backref("waitlist", cascade="all, delete-orphan"))
+    service = db.relationship("Service")
+
+# ----------------- REVOKED TOKENS -----------------
+# JWT ids revoked by logout, plus "sub:<customer id>" rows for disabled
+# accounts. Checked through revocation.py's per-worker Bloom filter.
+class RevokedToken(db.Model):
+    __tablename__ = "revoked_token"
+
+    key = db.Column(db.String(64), primary_key=True)
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)  # None = until restored
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+# ----------------- TOMBSTONES -----------------
+# Deleted rows of the tables kiosks mirror, so /sync/pull can report deletes
+class Tombstone(db.Model):
+    __tablename__ = "tombstone"
+    __table_args__ = (
+        db.Index("ix_tombstone_deleted_at", "deleted_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(30), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    branch_id = db.Column(db.Integer, nullable=True)  # None for rows shared by all branches
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+# ----------------- EXPORT JOBS -----------------
+class ExportJob(db.Model, SerializerMixin):
+    __tablename__ = "export_job"
+    serialize_only = (
+        "id", "kind", "params", "status", "rows_written", "rows_total", "error",
+        "created_at", "started_at", "finished_at",
+    )
+    # Workers claim the oldest queued job (or a running one whose worker stopped heartbeating)
+    __table_args__ = (db.Index("ix_export_job_status_id", "status", "id"),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)  # bookings, payments
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, running, done, failed
+    branch_id = db.Column(db.Integer, nullable=True)  # branch the export was requested in; None = all
+    requested_by = db.Column(db.Integer, nullable=False)  # admin customer id; no FK so the export outlives the account
+    rows_written = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rows_total = db.Column(db.Integer, nullable=True)
+    file_path = db.Column(db.String(255), nullable=True)
+    error = db.Column(db.String(255), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+# ----------------- STYLIST FEATURES -----------------
+# Per-stylist ranking inputs, kept current by the listeners below and cached
+# per worker by recommend.py (which re-reads rows by updated_at).
+class StylistFeatures(db.Model):
+    __tablename__ = "stylist_features"
+
+    stylist_id = db.Column(db.Integer, db.ForeignKey("stylist.id", ondelete="CASCADE"), primary_key=True)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    active_bookings = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # pending/confirmed
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+# ----------------- LEADERBOARD -----------------
+# Bookings taken and revenue received per stylist and per service. The
+# listeners below add to the current minute's bucket; leaderboard.compact rolls
+# old minutes into hours and old hours into days.
+class LeaderboardBucket(db.Model, BranchScoped):
+    __tablename__ = "leaderboard_bucket"
+    __table_args__ = (db.Index("ix_leaderboard_bucket_granularity_start", "granularity", "bucket_start"),)
+
+    dimension = db.Column(db.String(10), primary_key=True)  # stylist, service
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    granularity = db.Column(db.String(6), primary_key=True)  # minute, hour, day
+    subject_id = db.Column(db.Integer, primary_key=True)  # stylist or service id
+    branch_id = db.Column(db.Integer, nullable=False)
+    bookings = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # taken minus cancelled
+    revenue = db.Column(db.Float, nullable=False, default=0, server_default="0")  # successful minus refunded
+
+# ----------------- ARCHIVE -----------------
+# Finished bookings older than BOOKING_ARCHIVE_AFTER_DAYS are moved here by
+# archive.archive_bookings. Rows keep their ids; there are no foreign keys so
+# the tables can be range partitioned on PostgreSQL.
+class ArchivedBooking(db.Model, SerializerMixin, BranchScoped):
+    __tablename__ = "booking_archive"
+    serialize_rules = ("-customer.bookings", "-stylist.bookings", "-service.bookings")
+    __table_args__ = (
+        db.Index("ix_booking_archive_stylist_time", "stylist_id", "appointment_time"),
+        db.Index("ix_booking_archive_customer_time", "customer_id", "appointment_time"),
+        db.Index("ix_booking_archive_branch_time", "branch_id", "appointment_time"),
+        db.Index("ix_booking_archive_status_time", "status", "appointment_time"),
+        {"postgresql_partition_by": "RANGE (appointment_time)"},
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    appointment_time = db.Column(db.DateTime, primary_key=True)
+    status = db.Column(db.String(20))
+    customer_id = db.Column(db.Integer, nullable=False)
+    stylist_id = db.Column(db.Integer, nullable=False)
+    service_id = db.Column(db.Integer, nullable=False)
+    branch_id = db.Column(db.Integer, nullable=False)
+
+    customer = db.relationship(
+        "Customer", primaryjoin="foreign(ArchivedBooking.customer_id) == Customer.id", viewonly=True
+    )
+    stylist = db.relationship(
+        "Stylist", primaryjoin="foreign(ArchivedBooking.stylist_id) == Stylist.id", viewonly=True
+    )
+    service = db.relationship(
+        "Service", primaryjoin="foreign(ArchivedBooking.service_id) == Service.id", viewonly=True
+    )
+
+
+class ArchivedNotification(db.Model, SerializerMixin):
+    __tablename__ = "notification_archive"
+    __table_args__ = (
+        db.Index("ix_notification_archive_booking", "booking_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    message = db.Column(db.String(255), nullable=False)
+    type = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime)
+    customer_id = db.Column(db.Integer, nullable=False, index=True)
+    booking_id = db.Column(db.Integer, nullable=True)
+
+# ----------------- BRANCH SCOPING -----------------
+# Requests carrying a branch (tenancy.branch_from_request) only see that
+# branch's stylists, services and bookings. Pass
+# execution_options(all_branches=True) to look across branches.
+@event.listens_for(BranchSession, "do_orm_execute")
+def _scope_to_branch(execute_state):
+    branch_id = current_branch_id()
+    if (
+        branch_id is None
+        or not execute_state.is_select
+        or execute_state.is_column_load
+        or execute_state.is_relationship_load
+        or execute_state.execution_options.get("all_branches")
+    ):
+        return
+    execute_state.statement = execute_state.statement.options(with_loader_criteria(
+        BranchScoped, lambda cls: cls.branch_id == branch_id, include_aliases=True
+    ))
+
+
+@event.listens_for(Booking, "before_insert")
+@event.listens_for(Booking, "before_update")
+def _booking_branch(mapper, connection, target):
+    """A booking belongs to its stylist's branch"""
+    if target.branch_id is None or inspect(target).attrs.stylist_id.history.has_changes():
+        target.branch_id = connection.scalar(select(Stylist.branch_id).where(Stylist.id == target.stylist_id))
+
+# ----------------- SYNC TRACKING -----------------
+# updated_at is stamped on every ORM change to the tables kiosks mirror
+# (including collection-only changes such as a stylist's services), and
+# deletes leave a tombstone. Bulk Core updates must set updated_at themselves.
+SYNCED_MODELS = (Branch, Customer, Service, Stylist, Booking)
+
+
+@event.listens_for(BranchSession, "before_flush")
+def _stamp_updated(session, flush_context, instances):
+    for obj in session.dirty:
+        if isinstance(obj, SYNCED_MODELS) and session.is_modified(obj):
+            obj.updated_at = datetime.utcnow()
+
+
+def _tombstone_listener(mapper, connection, target):
+    connection.execute(Tombstone.__table__.insert().values(
+        entity=target.__tablename__,
+        entity_id=target.id,
+        branch_id=getattr(target, "branch_id", None),
+        deleted_at=datetime.utcnow(),
+    ))
+
+
+for _model in SYNCED_MODELS:
+    event.listen(_model, "after_delete", _tombstone_listener)
+
+# ----------------- COUNTERS -----------------
+# Customer counters are adjusted with a relative UPDATE inside the same flush
+# as the booking/payment change, so they stay consistent without COUNT/SUM.
+BOOKING_STATUS_COUNTERS = {"completed": "completed_bookings", "cancelled": "cancelled_bookings"}
+
+
+def bump_customer(connection, customer_id, **deltas):
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = Customer.__table__
+    connection.execute(
+        table.update()
+        .where(table.c.id == customer_id)
+        .values({table.c[name]: table.c[name] + delta for name, delta in deltas.items()})
+    )
+
+
+def _previous(target, name):
+    history = inspect(target).attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(target, name)
+
+
+def _status_deltas(old_status, new_status):
+    deltas = {}
+    if old_status in BOOKING_STATUS_COUNTERS:
+        deltas[BOOKING_STATUS_COUNTERS[old_status]] = -1
+    if new_status in BOOKING_STATUS_COUNTERS:
+        name = BOOKING_STATUS_COUNTERS[new_status]
+        deltas[name] = deltas.get(name, 0) + 1
+    return deltas
+
+
+ACTIVE_BOOKING_STATUSES = ("pending", "confirmed")
+
+
+def bump_features(connection, stylist_id, **deltas):
+    deltas = {name: delta for name, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = StylistFeatures.__table__
+    values = {table.c[name]: table.c[name] + delta for name, delta in deltas.items()}
+    values[table.c.updated_at] = datetime.utcnow()
+    connection.execute(table.update().where(table.c.stylist_id == stylist_id).values(values))
+
+
+def _is_active(status):
+    return 1 if (status or "pending") in ACTIVE_BOOKING_STATUSES else 0
+
+
+def payment_spend(status, amount):
+    return amount if status == "successful" else 0
+
+
+LEADERBOARD_KEY = ("dimension", "bucket_start", "granularity", "subject_id")
+
+
+def add_to_buckets(connection, rows):
+    """Add each row's bookings/revenue to its leaderboard bucket, creating the bucket if needed"""
+    if not rows:
+        return
+    table = LeaderboardBucket.__table__
+    dialect = {"postgresql": postgresql, "sqlite": sqlite}.get(connection.dialect.name)
+    if dialect is not None:
+        statement = dialect.insert(table)
+        connection.execute(statement.on_conflict_do_update(index_elements=LEADERBOARD_KEY, set_={
+            "bookings": table.c.bookings + statement.excluded.bookings,
+            "revenue": table.c.revenue + statement.excluded.revenue,
+        }), rows)
+        return
+    for row in rows:
+        key = [table.c[name] == row[name] for name in LEADERBOARD_KEY]
+        updated = connection.execute(table.update().where(*key).values(
+            bookings=table.c.bookings + row["bookings"], revenue=table.c.revenue + row["revenue"],
+        )).rowcount
+        if not updated:
+            connection.execute(table.insert().values(row))
+
+
+def bump_leaderboard(connection, totals):
+    """Add {(stylist_id, service_id, branch_id, when): (bookings, revenue)} to the minute of ``when``.
+
+    Reversals (cancellations, refunds) carry the time of the event they undo,
+    so they cancel out in the same bucket instead of going negative today.
+    """
+    rows = [
+        {"dimension": dimension, "bucket_start": when.replace(second=0, microsecond=0), "granularity": "minute",
+         "subject_id": subject_id, "branch_id": branch_id, "bookings": bookings, "revenue": revenue}
+        for (stylist_id, service_id, branch_id, when), (bookings, revenue) in totals.items()
+        if bookings or revenue
+        for dimension, subject_id in (("stylist", stylist_id), ("service", service_id))
+    ]
+    add_to_buckets(connection, rows)
+
+
+def bump_revenue(connection, deltas):
+    """Credit {(booking_id, paid_at): amount} to the leaderboard of each booking's stylist and service"""
+    deltas = {key: delta for key, delta in deltas.items() if key[0] is not None and delta}
+    found = {}
+    for table in (Booking.__table__, ArchivedBooking.__table__):
+        missing = list({booking_id for booking_id, _ in deltas if booking_id not in found})
+        if not missing:
+            break
+        found.update(
+            (row.id, (row.stylist_id, row.service_id, row.branch_id))
+            for row in connection.execute(
+                select(table.c.id, table.c.stylist_id, table.c.service_id, table.c.branch_id)
+                .where(table.c.id.in_(missing))
+            )
+        )
+    totals = {}
+    for (booking_id, paid_at), delta in deltas.items():
+        if booking_id in found:
+            key = (*found[booking_id], paid_at or datetime.utcnow())
+            bookings, revenue = totals.get(key, (0, 0))
+            totals[key] = (bookings, revenue + delta)
+    bump_leaderboard(connection, totals)
+
+
+def _leaderboard_entry(target, previous=False):
+    """(stylist_id, service_id, branch_id, created_at) and whether the booking counts (is not cancelled)"""
+    value = (lambda name: _previous(target, name)) if previous else (lambda name: getattr(target, name))
+    if target.created_at is None:
+        return None, 0  # taken before the leaderboard existed, so never counted
+    key = (value("stylist_id"), value("service_id"), value("branch_id"), target.created_at)
+    return key, int(value("status") != "cancelled")
+
+
+def _booking_leaderboard(connection, old, new):
+    totals = {}
+    for (key, counted), sign in ((old, -1), (new, 1)):
+        if key is not None and counted:
+            totals[key] = (totals.get(key, (0, 0))[0] + sign, 0)
+    bump_leaderboard(connection, totals)
+
+
+@event.listens_for(Booking, "after_insert")
+def _booking_inserted(mapper, connection, target):
+    bump_customer(connection, target.customer_id, total_bookings=1, **_status_deltas(None, target.status))
+    bump_features(connection, target.stylist_id, active_bookings=_is_active(target.status))
+    _booking_leaderboard(connection, (None, 0), _leaderboard_entry(target))
+
+
+@event.listens_for(Booking, "after_update")
+def _booking_updated(mapper, connection, target):
+    old_status = _previous(target, "status")
+    if old_status != target.status:
+        bump_customer(connection, target.customer_id, **_status_deltas(old_status, target.status))
+    old_stylist_id = _previous(target, "stylist_id")
+    if old_stylist_id != target.stylist_id:
+        bump_features(connection, old_stylist_id, active_bookings=-_is_active(old_status))
+        bump_features(connection, target.stylist_id, active_bookings=_is_active(target.status))
+    else:
+        bump_features(connection, target.stylist_id, active_bookings=_is_active(target.status) - _is_active(old_status))
+    _booking_leaderboard(connection, _leaderboard_entry(target, previous=True), _leaderboard_entry(target))
+
+
+@event.listens_for(Booking, "after_delete")
+def _booking_deleted(mapper, connection, target):
+    bump_customer(connection, target.customer_id, total_bookings=-1, **_status_deltas(target.status, None))
+    bump_features(connection, target.stylist_id, active_bookings=-_is_active(target.status))
+    _booking_leaderboard(connection, _leaderboard_entry(target), (None, 0))
+
+
+@event.listens_for(Stylist, "after_insert")
+def _stylist_inserted(mapper, connection, target):
+    connection.execute(StylistFeatures.__table__.insert().values(stylist_id=target.id, updated_at=datetime.utcnow()))
+
+
+@event.listens_for(Stylist, "before_delete")
+def _stylist_deleted(mapper, connection, target):
+    table = StylistFeatures.__table__
+    connection.execute(table.delete().where(table.c.stylist_id == target.id))
+
+
+@event.listens_for(Review, "after_insert")
+def _review_inserted(mapper, connection, target):
+    bump_features(connection, target.stylist_id, rating_sum=target.rating, rating_count=1)
+
+
+@event.listens_for(Review, "after_update")
+def _review_updated(mapper, connection, target):
+    bump_features(connection, target.stylist_id, rating_sum=target.rating - _previous(target, "rating"))
+
+
+@event.listens_for(Review, "after_delete")
+def _review_deleted(mapper, connection, target):
+    bump_features(connection, target.stylist_id, rating_sum=-target.rating, rating_count=-1)
+
+
+@event.listens_for(Payment, "after_insert")
+def _payment_inserted(mapper, connection, target):
+    spend = payment_spend(target.status, target.amount)
+    bump_customer(connection, target.customer_id, lifetime_spend=spend)
+    bump_revenue(connection, {(target.booking_id, target.created_at): spend})
+
+
+@event.listens_for(Payment, "after_update")
+def _payment_updated(mapper, connection, target):
+    old = payment_spend(_previous(target, "status"), _previous(target, "amount"))
+    new = payment_spend(target.status, target.amount)
+    bump_customer(connection, target.customer_id, lifetime_spend=new - old)
+    old_booking_id = _previous(target, "booking_id")
+    if old_booking_id != target.booking_id:
+        bump_revenue(connection, {
+            (old_booking_id, target.created_at): -old,
+            (target.booking_id, target.created_at): new,
+        })
+    else:
+        bump_revenue(connection, {(target.booking_id, target.created_at): new - old})
+
+
+@event.listens_for(Payment, "after_delete")
+def _payment_deleted(mapper, connection, target):
+    spend = payment_spend(target.status, target.amount)
+    bump_customer(connection, target.customer_id, lifetime_spend=-spend)
+    bump_revenue(connection, {(target.booking_id, target.created_at): -spend})
+
+
+def is_unread(status):
+    return 1 if (status or "unread") == "unread" else 0
+
+
+@event.listens_for(Notification, "after_insert")
+def _notification_inserted(mapper, connection, target):
+    bump_customer(connection, target.customer_id, unread_notifications=is_unread(target.status))
+
+
+@event.listens_for(Notification, "after_update")
+def _notification_updated(mapper, connection, target):
+    old = is_unread(_previous(target, "status"))
+    bump_customer(connection, target.customer_id, unread_notifications=is_unread(target.status) - old)
+
+
+@event.listens_for(Notification, "after_delete")
+def _notification_deleted(mapper, connection, target):
+    bump_customer(connection, target.customer_id, unread_notifications=-is_unread(target.status))
+
+# ----------------- OUTBOX -----------------
+# Every booking/customer/payment write also appends an outbox_event row in the
+# same transaction, so GET /changes can be tailed by seq instead of re-reading
+# whole lists. Payloads carry the columns below (never password hashes); for
+# deletes they hold the row as it was.
+OUTBOX_FIELDS = {
+    Booking: ("id", "appointment_time", "status", "branch_id", "customer_id", "stylist_id", "service_id"),
+    Customer: ("id", "name", "phone", "is_admin"),
+    Payment: ("id", "booking_id", "customer_id", "amount", "method", "status", "transaction_id", "created_at"),
+}
+
+
+class OutboxEvent(db.Model):
+    __tablename__ = "outbox_event"
+
+    seq = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(30), nullable=False)  # booking, customer, payment
+    entity_id = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(10), nullable=False)  # created, updated, deleted
+    payload = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+def outbox_event(model, action, source, **overrides):
+    """Outbox row for ``source`` (an instance or a result row with the OUTBOX_FIELDS)"""
+    payload = {}
+    for name in OUTBOX_FIELDS[model]:
+        value = overrides.get(name, getattr(source, name))
+        payload[name] = value.isoformat() if isinstance(value, datetime) else value
+    return {
+        "entity": model.__tablename__,
+        "entity_id": source.id,
+        "action": action,
+        "payload": payload,
+        "created_at": datetime.utcnow(),
+    }
+
+
+# Booking events wake the live stream hubs (stream.py): NOTIFY is delivered on
+# commit on PostgreSQL, other databases flag the connection for a local wake-up
+BOOKING_CHANNEL = "booking_changes"
+
+
+def record_changes(connection, events):
+    if not events:
+        return
+    connection.execute(OutboxEvent.__table__.insert(), events)
+    if any(e["entity"] == Booking.__tablename__ for e in events):
+        if connection.dialect.name == "postgresql":
+            connection.execute(text(f"NOTIFY {BOOKING_CHANNEL}"))
+        else:
+            connection.info["booking_changed"] = True
+
+
+def _outbox_listener(model, action):
+    def listener(mapper, connection, target):
+        if action == "updated":
+            state = inspect(target)
+            if not any(state.attrs[name].history.has_changes() for name in OUTBOX_FIELDS[model]):
+                return
+        record_changes(connection, [outbox_event(model, action, target)])
+    return listener
+
+
+for _model in OUTBOX_FIELDS:
+    for _event, _action in (("after_insert", "created"), ("after_update", "updated"), ("after_delete", "deleted")):
+        event.listen(_model, _event, _outbox_listener(_model, _action))
@@ -0,0 +1,213 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, make_response, request
+
+# Priority classes, most important first. Namespaces not listed are "normal";
+# "METHOD namespace" entries take precedence over the bare namespace.
+PRIORITY_CLASSES = ("critical", "normal", "low")
+DEFAULT_PRIORITIES = {
+    "POST bookings": "critical",
+    "POST sync": "critical",  # bookings taken on kiosks while offline
+    # Login and register are unauthenticated bcrypt work, so a flood of them must stay sheddable
+    "auth": "normal",
+    "analytics": "low",
+    "exports": "low",
+    "leaderboard": "low",
+    "changes": "low",
+}
+
+# Share of the adaptive limit the other classes' requests in flight may fill before
+# one of this class is shed; critical requests are never shed nor counted against it
+DEFAULT_SHARES = {"critical": None, "normal": 0.8, "low": 0.5}
+DEFAULT_RETRY_AFTER = {"normal": 2, "low": 10}
+
+# Namespaces whose list and detail GETs are public and the same for every caller,
+# so a stale copy can be served instead of querying when the worker is overloaded.
+# Deeper routes (recommendations, calendars) depend on the caller or change by the
+# minute, and requests carrying a token are never cached.
+CATALOG_NAMESPACES = ("services", "stylists", "branches")
+CATALOG_DEPTH = 2
+
+# Long-lived streams would hold a slot (and skew latency) for minutes
+EXEMPT_NAMESPACES = ("stream",)
+
+
+# ----------------- ADAPTIVE LIMIT -----------------
+class AdaptiveLimit:
+    """Concurrency limit that follows observed latency (gradient style).
+
+    Each endpoint keeps its no-load latency (the lowest it has seen, slowly
+    forgotten); a request's slowdown is its latency over that baseline. While
+    the smoothed slowdown stays within ``tolerance`` the limit grows by about
+    the square root of itself, and once queueing pushes latency up it shrinks
+    in proportion.
+    """
+
+    def __init__(self, initial=20, minimum=4, maximum=200, tolerance=2.0, smoothing=0.2, forget=0.001):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.forget = forget
+        self.slowdown = 1.0
+        self._baselines = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, inflight):
+        with self._lock:
+            baseline = self._baselines.get(endpoint)
+            baseline = seconds if baseline is None else min(baseline * (1 + self.forget), seconds)
+            self._baselines[endpoint] = baseline
+            self.slowdown += self.smoothing * (seconds / max(baseline, 1e-6) - self.slowdown)
+            gradient = min(max(self.tolerance / self.slowdown, 0.5), 1.0)
+            target = self.limit * gradient + math.sqrt(self.limit)
+            # An idle worker says nothing about how much more it could take
+            if target > self.limit and inflight < self.limit / 2:
+                return
+            self.limit += self.smoothing * (target - self.limit)
+            self.limit = min(max(self.limit, self.minimum), self.maximum)
+
+
+# ----------------- STALE CACHE -----------------
+class StaleCache:
+    """Last good response of each catalog GET in this worker, served only when overloaded"""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def store(self, key, response):
+        with self._lock:
+            self._entries[key] = (time.time(), response.get_data(), response.mimetype)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key, max_age):
+        entry = self._entries.get(key)
+        if entry is None or time.time() - entry[0] > max_age:
+            return None
+        return entry
+
+
+# ----------------- SHEDDER -----------------
+class LoadShedder:
+    """Per-worker overload protection by priority class.
+
+    Requests are counted in flight against an ``AdaptiveLimit``. Once normal
+    and low requests have filled a class's share of the limit (critical ones
+    always get in and are not counted), further requests of that class get a
+    fast 503 with ``Retry-After`` (catalog GETs get their last good response
+    instead, when there is one), so booking creation keeps its latency while
+    analytics and browsing back off. ``OVERLOAD_PRIORITIES``,
+    ``OVERLOAD_SHARES`` and ``OVERLOAD_RETRY_AFTER`` override the defaults.
+    """
+
+    def __init__(self, app=None):
+        self.limit = None
+        self.stale = StaleCache()
+        self.inflight = dict.fromkeys(PRIORITY_CLASSES, 0)
+        self.shed = dict.fromkeys(PRIORITY_CLASSES, 0)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("OVERLOAD_ENABLED", True)
+        app.config.setdefault("OVERLOAD_PRIORITIES", {})
+        app.config.setdefault("OVERLOAD_SHARES", {})
+        app.config.setdefault("OVERLOAD_RETRY_AFTER", {})
+        app.config.setdefault("OVERLOAD_STALE_SECONDS", 3600)
+        self.limit = AdaptiveLimit(
+            initial=app.config.get("OVERLOAD_INITIAL_LIMIT", 20),
+            minimum=app.config.get("OVERLOAD_MIN_LIMIT", 4),
+            maximum=app.config.get("OVERLOAD_MAX_LIMIT", 200),
+            tolerance=app.config.get("OVERLOAD_LATENCY_TOLERANCE", 2.0),
+        )
+        app.before_request(self._admit)
+        app.after_request(self._remember)
+        app.teardown_request(self._release)
+        app.extensions["overload"] = self
+
+    def priority(self, method, namespace):
+        priorities = {**DEFAULT_PRIORITIES, **current_app.config["OVERLOAD_PRIORITIES"]}
+        return priorities.get(f"{method} {namespace}", priorities.get(namespace, "normal"))
+
+    def _share(self, priority):
+        return {**DEFAULT_SHARES, **current_app.config["OVERLOAD_SHARES"]}.get(priority)
+
+    def _retry_after(self, priority):
+        return {**DEFAULT_RETRY_AFTER, **current_app.config["OVERLOAD_RETRY_AFTER"]}.get(priority, 1)
+
+    def _admit(self):
+        namespace = request.path.strip("/").split("/", 1)[0]
+        if not current_app.config["OVERLOAD_ENABLED"] or namespace in EXEMPT_NAMESPACES:
+            return None
+        priority = self.priority(request.method, namespace)
+        unshed = [name for name in PRIORITY_CLASSES if self._share(name) is None]
+        share = self._share(priority)
+        with self._lock:
+            sheddable = sum(self.inflight.values()) - sum(self.inflight[name] for name in unshed)
+            admitted = share is None or sheddable < self.limit.limit * share
+            if admitted:
+                self.inflight[priority] += 1
+            else:
+                self.shed[priority] += 1
+        if admitted:
+            g.overload = (time.perf_counter(), namespace, priority)
+            return None
+
+        if self._cacheable(namespace):
+            cached = self.stale.get(self._cache_key(), current_app.config["OVERLOAD_STALE_SECONDS"])
+            if cached is not None:
+                stored, body, mimetype = cached
+                response = make_response(body, 200)
+                response.mimetype = mimetype
+                response.headers["Age"] = str(int(time.time() - stored))
+                response.headers["X-Cache"] = "stale"
+                return response
+        return (
+            {"error": "Server busy, try again shortly"}, 503,
+            {"Retry-After": str(self._retry_after(priority))},
+        )
+
+    def _cacheable(self, namespace):
+        return (
+            request.method == "GET"
+            and namespace in CATALOG_NAMESPACES
+            and len(request.path.strip("/").split("/")) <= CATALOG_DEPTH
+            and "Authorization" not in request.headers
+        )
+
+    def _cache_key(self):
+        return request.full_path, request.headers.get("X-Branch-ID")
+
+    def _remember(self, response):
+        admitted = g.get("overload")
+        if (
+            admitted is not None
+            and self._cacheable(admitted[1])
+            and response.status_code == 200
+            and not response.direct_passthrough
+        ):
+            self.stale.store(self._cache_key(), response)
+        return response
+
+    def _release(self, exc):
+        admitted = g.pop("overload", None)
+        if admitted is None:
+            return
+        with self._lock:
+            inflight = sum(self.inflight.values())
+            self.inflight[admitted[2]] -= 1
+        self.limit.record(request.endpoint, time.perf_counter() - admitted[0], inflight)
+
+    def stats(self):
+        return {"limit": round(self.limit.limit, 1), "inflight": dict(self.inflight), "shed": dict(self.shed)}
+
+
+shedder = LoadShedder()
@@ -0,0 +1,132 @@
+from datetime import datetime
+from sqlalchemy import delete, exists, insert, select, true, update
+from models import db, Service, Stylist, stylist_service
+
+# Which services each stylist offers is only ever changed here, as set
+# operations on stylist_service: one INSERT ... SELECT for the missing pairs
+# and one DELETE for the dropped ones, whatever the number of ids.
+
+
+class AssignmentError(ValueError):
+    pass
+
+
+def _ids(values, name):
+    if values is not None and not isinstance(values, (list, tuple, set)):
+        raise AssignmentError(f"'{name}' must be a list of ids")
+    try:
+        return {int(value) for value in values or ()}
+    except (TypeError, ValueError):
+        raise AssignmentError(f"'{name}' must be a list of ids")
+
+
+def _branches(model, ids):
+    """id -> branch_id for the ids that exist (in the current branch); raises for unknown ids"""
+    if not ids:
+        return {}
+    found = dict(db.session.execute(select(model.id, model.branch_id).where(model.id.in_(ids))).all())
+    missing = sorted(ids - found.keys())
+    if missing:
+        raise AssignmentError(f"Unknown {model.__tablename__} ids: {missing}")
+    return found
+
+
+def _check_branch(stylist_ids, service_ids):
+    branches = set(_branches(Stylist, stylist_ids).values()) | set(_branches(Service, service_ids).values())
+    if len(branches) > 1:
+        raise AssignmentError("Stylists can only offer services of their own branch")
+
+
+def _stamp(stylist_ids):
+    """Mark stylists whose services changed, so kiosks pull the new service_ids"""
+    if stylist_ids:
+        # ORM-enabled so stylists already in the session get the new stamp back through RETURNING
+        db.session.execute(
+            update(Stylist)
+            .where(Stylist.id.in_(set(stylist_ids)))
+            .values(updated_at=datetime.utcnow())
+            .execution_options(synchronize_session="fetch")
+        )
+
+
+def _link(stylist_ids, service_ids):
+    """Insert the missing pairs of stylist_ids x service_ids; returns the stylist of each new pair"""
+    if not stylist_ids or not service_ids:
+        return []
+    linked = exists().where(
+        stylist_service.c.stylist_id == Stylist.__table__.c.id,
+        stylist_service.c.service_id == Service.__table__.c.id,
+    )
+    rows = db.session.execute(
+        insert(stylist_service)
+        .from_select(
+            ["stylist_id", "service_id"],
+            select(Stylist.__table__.c.id, Service.__table__.c.id)
+            .select_from(Stylist.__table__.join(Service.__table__, true()))  # every pair, deliberately
+            .where(Stylist.__table__.c.id.in_(stylist_ids), Service.__table__.c.id.in_(service_ids), ~linked),
+        )
+        .returning(stylist_service.c.stylist_id)
+    ).all()
+    return [stylist_id for stylist_id, in rows]
+
+
+def _unlink(*criteria):
+    """Delete the matching pairs; returns the stylist of each deleted pair"""
+    rows = db.session.execute(delete(stylist_service).where(*criteria).returning(stylist_service.c.stylist_id)).all()
+    return [stylist_id for stylist_id, in rows]
+
+
+def link(stylist_ids, service_ids):
+    """Let every stylist in ``stylist_ids`` offer every service in ``service_ids``; returns pairs added.
+
+    Everything must belong to one branch. Nothing is committed.
+    """
+    stylist_ids, service_ids = _ids(stylist_ids, "stylist_ids"), _ids(service_ids, "service_ids")
+    _check_branch(stylist_ids, service_ids)
+    added = _link(stylist_ids, service_ids)
+    _stamp(added)
+    return len(added)
+
+
+def unlink(stylist_ids, service_ids):
+    """Remove every pair of ``stylist_ids`` x ``service_ids``; returns pairs removed"""
+    stylist_ids, service_ids = _ids(stylist_ids, "stylist_ids"), _ids(service_ids, "service_ids")
+    if not stylist_ids or not service_ids:
+        return 0
+    removed = _unlink(stylist_service.c.stylist_id.in_(stylist_ids), stylist_service.c.service_id.in_(service_ids))
+    _stamp(removed)
+    return len(removed)
+
+
+def set_services(stylist_id, service_ids):
+    """Make ``service_ids`` exactly the services ``stylist_id`` offers"""
+    service_ids = _ids(service_ids, "service_ids")
+    _check_branch({stylist_id}, service_ids)
+    removed = _unlink(
+        stylist_service.c.stylist_id == stylist_id,
+        stylist_service.c.service_id.not_in(service_ids),
+    )
+    added = _link({stylist_id}, service_ids)
+    _stamp(set(added) | set(removed))
+    return sorted(service_ids)
+
+
+def set_stylists(service_id, stylist_ids):
+    """Make ``stylist_ids`` exactly the stylists offering ``service_id``"""
+    stylist_ids = _ids(stylist_ids, "stylist_ids")
+    _check_branch(stylist_ids, {service_id})
+    removed = _unlink(
+        stylist_service.c.service_id == service_id,
+        stylist_service.c.stylist_id.not_in(stylist_ids),
+    )
+    added = _link(stylist_ids, {service_id})
+    _stamp(set(added) | set(removed))
+    return sorted(stylist_ids)
+
+
+def services_of(stylist_id):
+    return sorted(db.session.scalars(select(stylist_service.c.service_id).where(stylist_service.c.stylist_id == stylist_id)))
+
+
+def stylists_of(service_id):
+    return sorted(db.session.scalars(select(stylist_service.c.stylist_id).where(stylist_service.c.service_id == service_id)))
@@ -0,0 +1,280 @@
+import json
+import os
+import random
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, select, text
+from flask_jwt_extended import create_access_token
+from analytics import forecast_cache
+from recommend import feature_cache
+from revocation import revocation_list
+from models import db, Branch, Booking, Customer, LeaderboardBucket, Notification, OutboxEvent, Payment, Service
+from models import Stylist, stylist_service
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_plans")
+
+# Read endpoints on the hot path; {placeholders} are filled from the seeded rows
+HOT_ENDPOINTS = {
+    "services": "/services/",
+    "service detail": "/services/{service}",
+    "service stylists": "/services/{service}/stylists",
+    "recommended stylists": "/services/{service}/recommended-stylists?at={day}T10:00:00",
+    "stylists": "/stylists/",
+    "stylist detail": "/stylists/{stylist}",
+    "stylist calendar": "/stylists/{stylist}/calendar?from={day}T00:00:00&to={week}T00:00:00",
+    "stylist portfolio": "/stylists/{stylist}/portfolio",
+    "bookings by stylist": "/bookings/?stylist_id={stylist}&sort=appointment_time",
+    "bookings by customer": "/bookings/?customer_id={customer}&sort=-appointment_time",
+    "bookings by status": "/bookings/?status=pending&sort=appointment_time",
+    "finished bookings by status": "/bookings/?status=completed&sort=-appointment_time",
+    "booking detail": "/bookings/{booking}",
+    "customer profile": "/profiles/customers/{customer}",
+    "customer appointments": "/profiles/customers/{customer}/appointments",
+    "notifications": "/notifications",
+    "unread count": "/notifications/unread-count",
+    "waitlist": "/waitlist/",
+    "change feed": "/changes?after=0",
+    "sync pull": "/sync/pull",
+    "forecast": "/analytics/forecast",
+    "leaderboard": "/leaderboard?window=week",
+}
+
+# Tables that grow with traffic; a full scan of one of these on a hot path is a regression.
+# Catalog tables (branches, services, stylists) are small enough to scan.
+LARGE_TABLES = {
+    "booking", "booking_archive", "notification", "notification_archive", "payment", "customer",
+    "outbox_event", "tombstone", "revoked_token", "waitlist_entry", "review", "portfolio", "leaderboard_bucket",
+}
+
+_IN_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s)\s*,)+\s*(?:\?|%\(\w+\)s)\s*\)")
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)")  # SCAN ... USING [COVERING] INDEX still reads every row
+
+
+def normalize(statement):
+    """SQL with whitespace collapsed and expanded IN lists folded, so it matches across runs"""
+    return _IN_LIST.sub("(?...)", " ".join(statement.split()))
+
+
+def _table(name):
+    return re.sub(r"_\d+$", "", name)
+
+
+def explain(connection, statement, parameters):
+    """Plan of one statement as a list of lines, and the large tables it scans in full"""
+    if connection.dialect.name == "postgresql":
+        (plan,), = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).fetchall()
+        lines, scans = [], set()
+
+        def walk(node, depth):
+            line = node["Node Type"]
+            if "Relation Name" in node:
+                line += f" on {node['Relation Name']}"
+            if "Index Name" in node:
+                line += f" using {node['Index Name']}"
+            lines.append("  " * depth + line)
+            if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in LARGE_TABLES:
+                scans.add(node["Relation Name"])
+            for child in node.get("Plans", ()):
+                walk(child, depth + 1)
+
+        walk(plan[0]["Plan"], 0)
+        return lines, scans
+
+    lines, scans = [], set()
+    for _, _, _, detail in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters):
+        lines.append(detail)
+        match = _SQLITE_SCAN.match(detail)
+        if match and _table(match.group(1)) in LARGE_TABLES:
+            scans.add(_table(match.group(1)))
+    return lines, scans
+
+
+def capture(client, path, headers):
+    """Run one request; returns (status code, number of statements, SELECTs with their parameters)"""
+    statements = []
+    issued = 0
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        nonlocal issued
+        issued += 1
+        if not executemany and statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        response = client.get(path, headers=headers)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    return response.status_code, issued, statements
+
+
+def _placeholders():
+    today = datetime.utcnow().date()
+    first = {
+        "stylist": db.session.scalar(select(func.min(Stylist.id))),
+        "service": db.session.scalar(select(func.min(Service.id))),
+        "customer": db.session.scalar(select(func.min(Customer.id))),
+        "booking": db.session.scalar(select(func.max(Booking.id))),
+    }
+    if None in first.values():
+        raise RuntimeError("The database is empty; run with --seed on an empty database first")
+    return dict(first, day=today.isoformat(), week=(today + timedelta(days=7)).isoformat())
+
+
+def collect(app):
+    """{endpoint: {"queries", "statements": [{"sql", "plan", "scans"}]}} for every hot endpoint, plus the endpoints that failed"""
+    admin = Customer.query.filter_by(is_admin=True).order_by(Customer.id).first()
+    if admin is None:
+        raise RuntimeError("An admin customer is needed to call the admin endpoints")
+    headers = {"Authorization": f"Bearer {create_access_token(identity=str(admin.id))}"}
+    values = _placeholders()
+    client = app.test_client()
+    plans, failed = {}, {}
+    # Start the per-worker caches cold and refresh the revocation filter on every request,
+    # so each endpoint issues the same queries from one run to the next
+    forecast_cache.__init__()
+    feature_cache.__init__()
+    revocation_list.__init__()
+    refresh = app.config.get("REVOCATION_REFRESH_SECONDS")
+    app.config["REVOCATION_REFRESH_SECONDS"] = 0
+    # Pooled connections may hold statements prepared before the schema last changed (SQLite keeps their plans)
+    db.engine.dispose()
+    try:
+        with db.engine.connect() as connection:
+            for name, path in HOT_ENDPOINTS.items():
+                status, issued, statements = capture(client, path.format(**values), headers)
+                if status >= 400:
+                    failed[name] = status
+                    continue
+                seen, entries = set(), []
+                for statement, parameters in statements:
+                    sql = normalize(statement)
+                    if sql in seen:
+                        continue
+                    seen.add(sql)
+                    lines, scans = explain(connection, statement, parameters)
+                    entries.append({"sql": sql, "plan": lines, "scans": sorted(scans)})
+                plans[name] = {"queries": issued, "statements": entries}
+    finally:
+        if refresh is None:
+            app.config.pop("REVOCATION_REFRESH_SECONDS")
+        else:
+            app.config["REVOCATION_REFRESH_SECONDS"] = refresh
+    return plans, failed
+
+
+def compare(plans, snapshot):
+    """Problems (full scans the snapshot did not have, more queries per request) and notes (other changes)"""
+    problems, notes = [], []
+    for name, endpoint in plans.items():
+        before_endpoint = snapshot.get(name, {"queries": None, "statements": []})
+        queries, was = endpoint["queries"], before_endpoint["queries"]
+        if was is not None and queries > was:
+            problems.append(f"{name}: {queries} queries per request, was {was}")
+        elif was is not None and queries < was:
+            notes.append(f"{name}: {queries} queries per request, was {was}")
+        known = {entry["sql"]: entry for entry in before_endpoint["statements"]}
+        for entry in endpoint["statements"]:
+            before = known.get(entry["sql"])
+            allowed = set(before["scans"]) if before else set()
+            new_scans = set(entry["scans"]) - allowed
+            if new_scans:
+                problems.append(f"{name}: full scan of {', '.join(sorted(new_scans))}\n    {entry['sql']}\n    "
+                                + "\n    ".join(entry["plan"]))
+            elif before is None:
+                notes.append(f"{name}: new query\n    {entry['sql']}")
+            elif before["plan"] != entry["plan"]:
+                notes.append(f"{name}: plan changed\n    {entry['sql']}\n    was: " + " | ".join(before["plan"])
+                             + "\n    now: " + " | ".join(entry["plan"]))
+    return problems, notes
+
+
+def snapshot_path(dialect, directory=None):
+    return os.path.join(directory or SNAPSHOT_DIR, f"{dialect}.json")
+
+
+def load_snapshot(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_snapshot(path, plans):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(plans, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def seed(bookings=50000, customers=2000, stylists=20, services=12, seed=1):
+    """Fill an empty database with a deterministic, production-shaped data set and ANALYZE it"""
+    if db.session.scalar(select(func.count()).select_from(Booking)):
+        raise RuntimeError("Refusing to seed a database that already has bookings")
+    rng = random.Random(seed)
+    now = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+
+    if db.session.get(Branch, 1) is None:
+        db.session.add(Branch(id=1, name="Main"))
+    catalog = [Service(title=f"Service {i}", price=10 + i, duration_minutes=rng.choice((30, 60, 90)), branch_id=1)
+               for i in range(services)]
+    team = [Stylist(name=f"Stylist {i}", branch_id=1) for i in range(stylists)]
+    db.session.add_all(catalog + team)
+    db.session.flush()
+    db.session.execute(stylist_service.insert(), [
+        {"stylist_id": stylist.id, "service_id": service.id}
+        for stylist in team for service in rng.sample(catalog, rng.randint(3, services))
+    ])
+    db.session.execute(Customer.__table__.insert(), [
+        {"name": f"Customer {i}", "phone": f"+2547{i:08d}", "password_hash": "!", "is_admin": i == 0,
+         "updated_at": now}
+        for i in range(customers)
+    ])
+    customer_ids = db.session.scalars(select(Customer.id)).all()
+
+    # Bulk inserts below skip the ORM listeners, so counters and the outbox are filled directly
+    rows = []
+    for i in range(bookings):
+        moment = now + timedelta(hours=rng.randrange(-24 * 365, 24 * 30))
+        rows.append({
+            "appointment_time": moment,
+            "status": rng.choice(("pending", "confirmed")) if moment > now else rng.choice(("completed", "cancelled")),
+            "branch_id": 1,
+            "updated_at": min(moment, now),
+            "customer_id": rng.choice(customer_ids),
+            "stylist_id": rng.choice(team).id,
+            "service_id": rng.choice(catalog).id,
+        })
+    db.session.execute(Booking.__table__.insert(), rows)
+    db.session.execute(Notification.__table__.insert(), [
+        {"message": "Reminder", "type": "reminder", "status": rng.choice(("unread", "read")),
+         "created_at": row["updated_at"], "customer_id": row["customer_id"]}
+        for row in rows[::2]
+    ])
+    db.session.execute(Payment.__table__.insert(), [
+        {"booking_id": i + 1, "customer_id": row["customer_id"], "amount": 20.0, "method": "mpesa",
+         "status": "successful", "created_at": row["updated_at"]}
+        for i, row in enumerate(rows) if row["status"] == "completed"
+    ])
+    db.session.execute(OutboxEvent.__table__.insert(), [
+        {"entity": "booking", "entity_id": i + 1, "action": "created", "payload": {}, "created_at": row["updated_at"]}
+        for i, row in enumerate(rows) if i >= len(rows) - 5000
+    ])
+    # A year of day buckets for the leaderboard, as compaction leaves them
+    buckets = {}
+    for row in rows:
+        if row["status"] == "cancelled":
+            continue
+        day = row["updated_at"].replace(hour=0)
+        revenue = 20.0 if row["status"] == "completed" else 0
+        for dimension, subject_id in (("stylist", row["stylist_id"]), ("service", row["service_id"])):
+            bookings, total = buckets.get((dimension, subject_id, day), (0, 0))
+            buckets[(dimension, subject_id, day)] = (bookings + 1, total + revenue)
+    db.session.execute(LeaderboardBucket.__table__.insert(), [
+        {"dimension": dimension, "bucket_start": day, "granularity": "day", "subject_id": subject_id, "branch_id": 1,
+         "bookings": bookings, "revenue": revenue}
+        for (dimension, subject_id, day), (bookings, revenue) in buckets.items()
+    ])
+    db.session.commit()
+    with db.engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
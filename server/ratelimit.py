@@ -0,0 +1,196 @@
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+
+# Limits per namespace: {namespace: {key_kind: "count/period"}}
+DEFAULT_LIMITS = {
+    "auth": {"ip": "10/minute", "phone": "5/minute"},
+    "customers": {"ip": "10/minute"},
+    "bookings": {"ip": "60/minute", "identity": "30/minute"},
+}
+
+# In-flight caps per namespace and worker: {namespace: (max_concurrent, queue_timeout_seconds)}
+DEFAULT_CONCURRENCY = {
+    "auth": (4, 2.0),
+    "customers": (4, 2.0),
+    "bookings": (8, 5.0),
+}
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_rate(value):
+    """Turn "10/minute" into (tokens_per_second, burst)"""
+    count, _, period = value.partition("/")
+    count = int(count)
+    return count / PERIODS[period.strip()], count
+
+
+# ----------------- KEYS -----------------
+def _ip_key():
+    return request.remote_addr
+
+
+def _phone_key():
+    data = request.get_json(silent=True) or {}
+    return data.get("phone")
+
+
+def _identity_key():
+    verify_jwt_in_request(optional=True)
+    return get_jwt_identity()
+
+
+KEY_FUNCS = {"ip": _ip_key, "phone": _phone_key, "identity": _identity_key}
+
+
+# ----------------- BACKENDS -----------------
+class MemoryBackend:
+    """Token buckets kept in this worker's memory, least recently used evicted first"""
+
+    max_keys = 10000
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        """Take one token; return 0 if allowed, else seconds until one is available"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class FileBackend:
+    """Token buckets in a SQLite file, shared by every worker on the host"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS bucket (key TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, rate, burst):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM bucket WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (burst, now)
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute(
+                "INSERT INTO bucket (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+# ----------------- LIMITER -----------------
+class RateLimiter:
+    """Per-namespace token-bucket limits and concurrency caps.
+
+    ``RATELIMIT_STORAGE`` is ``"memory"`` (per worker) or a path to a SQLite
+    file shared across gunicorn workers. ``RATELIMIT_LIMITS`` and
+    ``RATELIMIT_CONCURRENCY`` override the defaults per namespace.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self._semaphores = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RATELIMIT_ENABLED", True)
+        app.config.setdefault("RATELIMIT_STORAGE", "memory")
+        app.config.setdefault("RATELIMIT_LIMITS", {})
+        app.config.setdefault("RATELIMIT_CONCURRENCY", {})
+        storage = app.config["RATELIMIT_STORAGE"]
+        self.backend = MemoryBackend() if storage == "memory" else FileBackend(storage)
+        app.extensions["ratelimit"] = self
+
+    def _limits(self, scope):
+        return current_app.config["RATELIMIT_LIMITS"].get(scope, DEFAULT_LIMITS.get(scope, {}))
+
+    def _semaphore(self, scope):
+        with self._lock:
+            if scope not in self._semaphores:
+                cap = current_app.config["RATELIMIT_CONCURRENCY"].get(scope, DEFAULT_CONCURRENCY.get(scope))
+                self._semaphores[scope] = (threading.BoundedSemaphore(cap[0]), cap[1]) if cap else None
+            return self._semaphores[scope]
+
+    def check(self, scope):
+        """Return seconds the caller must wait, 0 when every bucket admits the request"""
+        wait = 0.0
+        for kind, rate in self._limits(scope).items():
+            value = KEY_FUNCS[kind]()
+            if value is None:
+                continue
+            per_second, burst = parse_rate(rate)
+            wait = max(wait, self.backend.take(f"{scope}:{kind}:{value}", per_second, burst))
+        return wait
+
+    def limit(self, scope):
+        """Decorator applying the namespace's rate limits and concurrency cap"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not current_app.config["RATELIMIT_ENABLED"]:
+                    return fn(*args, **kwargs)
+
+                wait = self.check(scope)
+                if wait > 0:
+                    return {"error": "Too many requests"}, 429, {"Retry-After": str(math.ceil(wait))}
+
+                slot = self._semaphore(scope)
+                if slot is None:
+                    return fn(*args, **kwargs)
+                semaphore, timeout = slot
+                if not semaphore.acquire(timeout=timeout):
+                    return {"error": "Server busy, try again shortly"}, 503, {"Retry-After": "1"}
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    semaphore.release()
+            return wrapper
+        return decorator
+
+
+limiter = RateLimiter()
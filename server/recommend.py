@@ -0,0 +1,131 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, select
+from models import db, Booking, Service, Stylist, StylistFeatures, stylist_service, ACTIVE_BOOKING_STATUSES
+from scheduling import LONGEST_SERVICE
+
+# Score weights; they sum to 1 so scores stay within [0, 1]
+WEIGHTS = {"rating": 0.35, "load": 0.15, "availability": 0.35, "history": 0.15}
+
+# Bayesian prior for ratings: stylists with few reviews are pulled towards PRIOR_RATING
+PRIOR_RATING = 3.5
+PRIOR_WEIGHT = 5
+
+# How far from the requested time neighbouring bookings still matter
+AVAILABILITY_WINDOW = timedelta(hours=3)
+
+
+class FeatureCache:
+    """Per-worker copy of stylist_features, refreshed by re-reading rows updated since the last sync"""
+
+    def __init__(self):
+        self.features = {}
+        self.synced_at = None
+        self.checked = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        interval = current_app.config.get("RECOMMEND_REFRESH_SECONDS", 5)
+        if time.monotonic() - self.checked >= interval:
+            with self._lock:
+                if time.monotonic() - self.checked >= interval:
+                    self._refresh()
+        return self.features
+
+    def _refresh(self):
+        table = StylistFeatures.__table__
+        query = select(table.c.stylist_id, table.c.rating_sum, table.c.rating_count,
+                       table.c.active_bookings, table.c.updated_at)
+        if self.synced_at is not None:
+            # Small overlap so rows committed out of timestamp order are not missed
+            query = query.where(table.c.updated_at >= self.synced_at - timedelta(seconds=5))
+        for stylist_id, rating_sum, rating_count, active, updated_at in db.session.execute(query):
+            rating = (rating_sum + PRIOR_RATING * PRIOR_WEIGHT) / (rating_count + PRIOR_WEIGHT)
+            self.features[stylist_id] = (rating, rating_count, active)
+            if self.synced_at is None or updated_at > self.synced_at:
+                self.synced_at = updated_at
+        if self.synced_at is None:
+            self.synced_at = datetime.utcnow()
+        self.checked = time.monotonic()
+
+
+feature_cache = FeatureCache()
+
+
+def _availability(at, duration, neighbours):
+    """(free, score): score is 1.0 when nothing is booked near ``at`` and 0 on overlap"""
+    end = at + duration
+    closest = AVAILABILITY_WINDOW
+    for start, minutes in neighbours:
+        finish = start + timedelta(minutes=minutes)
+        if start < end and finish > at:
+            return False, 0.0
+        closest = min(closest, at - finish if finish <= at else start - end)
+    return True, closest / AVAILABILITY_WINDOW
+
+
+def recommend_stylists(service, at, customer_id=None):
+    """Rank the stylists offering ``service`` for an appointment at ``at``.
+
+    Ratings and load come from the cached feature vectors; only availability
+    around ``at`` and the customer's history with each candidate are queried,
+    both through the (stylist_id|customer_id, appointment_time) indexes.
+    """
+    candidates = db.session.execute(
+        select(Stylist.id, Stylist.name)
+        .join(stylist_service, stylist_service.c.stylist_id == Stylist.id)
+        .where(stylist_service.c.service_id == service.id)
+    ).all()
+    if not candidates:
+        return []
+    ids = [stylist_id for stylist_id, _ in candidates]
+
+    neighbours = {}
+    for stylist_id, start, minutes in db.session.execute(
+        select(Booking.stylist_id, Booking.appointment_time, Service.duration_minutes)
+        .join(Service, Service.id == Booking.service_id)
+        .where(
+            Booking.stylist_id.in_(ids),
+            Booking.appointment_time > at - AVAILABILITY_WINDOW - LONGEST_SERVICE,
+            Booking.appointment_time < at + timedelta(minutes=service.duration_minutes) + AVAILABILITY_WINDOW,
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+        )
+    ):
+        neighbours.setdefault(stylist_id, []).append((start, minutes))
+
+    history = {}
+    if customer_id is not None:
+        history = dict(db.session.execute(
+            select(Booking.stylist_id, func.count(Booking.id))
+            .where(Booking.customer_id == customer_id, Booking.stylist_id.in_(ids))
+            .group_by(Booking.stylist_id)
+        ).all())
+
+    features = feature_cache.get()
+    busiest = max([features.get(i, (0, 0, 0))[2] for i in ids] + [1])
+    most_visited = max(list(history.values()) + [1])
+    duration = timedelta(minutes=service.duration_minutes)
+
+    ranked = []
+    for stylist_id, name in candidates:
+        rating, rating_count, active = features.get(stylist_id, (PRIOR_RATING, 0, 0))
+        free, available = _availability(at, duration, neighbours.get(stylist_id, ()))
+        score = (
+            WEIGHTS["rating"] * rating / 5
+            + WEIGHTS["load"] * (1 - active / busiest)
+            + WEIGHTS["availability"] * available
+            + WEIGHTS["history"] * history.get(stylist_id, 0) / most_visited
+        )
+        ranked.append({
+            "id": stylist_id,
+            "name": name,
+            "score": round(score, 4),
+            "rating": round(rating, 2),
+            "reviews": rating_count,
+            "active_bookings": active,
+            "available": free,
+        })
+    ranked.sort(key=lambda r: r["score"], reverse=True)
+    return ranked
@@ -0,0 +1,114 @@
+import csv
+from itertools import islice
+from sqlalchemy import bindparam, select, update
+from models import db, Customer, Payment, bump_revenue, payment_spend, outbox_event, record_changes
+
+# Statuses a provider settlement row may carry
+SETTLEMENT_STATUSES = ("successful", "failed", "refunded")
+AMOUNT_TOLERANCE = 0.005
+
+REPORT_COLUMNS = ["transaction_id", "reason", "settled_amount", "recorded_amount", "settled_status"]
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def reconcile_settlement(stream, report=None, chunk_size=1000):
+    """Match a settlement CSV (transaction_id, amount, status) against payments.
+
+    The file is consumed ``chunk_size`` rows at a time: each chunk costs one
+    ``IN`` lookup plus at most one ``UPDATE`` per target status. Rows that
+    cannot be applied are written to ``report`` as CSV.
+    """
+    writer = csv.writer(report) if report is not None else None
+    if writer:
+        writer.writerow(REPORT_COLUMNS)
+
+    summary = {"rows": 0, "updated": 0, "unchanged": 0, "mismatched": 0}
+    seen = set()
+
+    for chunk in _chunks(csv.DictReader(stream), chunk_size):
+        summary["rows"] += len(chunk)
+        mismatches = []
+        settled = {}
+
+        for row in chunk:
+            txn = (row.get("transaction_id") or "").strip()
+            status = (row.get("status") or "").strip().lower()
+            raw_amount = row.get("amount")
+            try:
+                amount = float(raw_amount)
+            except (TypeError, ValueError):
+                mismatches.append((txn, "invalid_amount", raw_amount, None, status))
+                continue
+            if not txn:
+                mismatches.append((txn, "missing_transaction_id", amount, None, status))
+            elif status not in SETTLEMENT_STATUSES:
+                mismatches.append((txn, "unknown_status", amount, None, status))
+            elif txn in seen:
+                mismatches.append((txn, "duplicate", amount, None, status))
+            else:
+                seen.add(txn)
+                settled[txn] = (amount, status)
+
+        recorded = db.session.execute(
+            select(Payment.__table__).where(Payment.transaction_id.in_(list(settled)))
+        ).all() if settled else []
+
+        by_status = {}
+        spend = {}
+        revenue = {}
+        events = []
+        for payment in recorded:
+            payment_id, txn, customer_id = payment.id, payment.transaction_id, payment.customer_id
+            recorded_amount, recorded_status = payment.amount, payment.status
+            amount, status = settled.pop(txn)
+            if abs(recorded_amount - amount) > AMOUNT_TOLERANCE:
+                mismatches.append((txn, "amount_mismatch", amount, recorded_amount, status))
+            elif recorded_status == "refunded" and status != "refunded":
+                mismatches.append((txn, "already_refunded", amount, recorded_amount, status))
+            elif recorded_status == status:
+                summary["unchanged"] += 1
+            else:
+                by_status.setdefault(status, []).append(payment_id)
+                events.append(outbox_event(Payment, "updated", payment, status=status))
+                delta = payment_spend(status, recorded_amount) - payment_spend(recorded_status, recorded_amount)
+                if delta:
+                    spend[customer_id] = spend.get(customer_id, 0) + delta
+                    key = (payment.booking_id, payment.created_at)
+                    revenue[key] = revenue.get(key, 0) + delta
+
+        for txn, (amount, status) in settled.items():
+            mismatches.append((txn, "not_found", amount, None, status))
+
+        for status, payment_ids in by_status.items():
+            db.session.execute(
+                update(Payment.__table__)
+                .where(Payment.__table__.c.id.in_(payment_ids))
+                .values(status=status)
+            )
+            summary["updated"] += len(payment_ids)
+        # Bulk updates skip the ORM listeners, so keep Customer.lifetime_spend, the leaderboard and the outbox in step here
+        record_changes(db.session.connection(), events)
+        bump_revenue(db.session.connection(), revenue)
+        if spend:
+            customers = Customer.__table__
+            db.session.execute(
+                update(customers)
+                .where(customers.c.id == bindparam("customer"))
+                .values(lifetime_spend=customers.c.lifetime_spend + bindparam("delta")),
+                [{"customer": customer_id, "delta": delta} for customer_id, delta in spend.items()],
+            )
+        db.session.commit()
+
+        summary["mismatched"] += len(mismatches)
+        if writer:
+            writer.writerows(mismatches)
+
+    return summary
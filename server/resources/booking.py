@@ -1,7 +1,12 @@
-from flask_restx import Namespace, Resource, fields
+from flask_restx import Namespace, Resource, fields, marshal
 from flask import request
 from datetime import datetime
-from models import db, Booking, Customer, Stylist, Service
+from models import db, Booking, Customer, Stylist, Service, ArchivedBooking, ACTIVE_BOOKING_STATUSES
+from ratelimit import limiter
+from fieldsets import FIELDS_HELP, marshal_sparse, sparse_fields, sparse_options
+from archive import needs_archive
+from waitlist import offer_booking_slot
+from assignment import choose_stylist
 
 # Namespace
 booking_ns = Namespace("bookings", description="Booking related operations")
@@ -28,6 +33,9 @@ service_model = booking_ns.model("Service", {
 booking_model = booking_ns.model("Booking", {
     "id": fields.Integer(readonly=True),
     "appointment_time": fields.DateTime(description="Appointment datetime"),
+    "status": fields.String(description="pending, confirmed, completed or cancelled"),
+    "branch_id": fields.Integer(readonly=True, description="Branch of the stylist"),
+    "auto_assigned": fields.Boolean(readonly=True, description="Stylist chosen by the server (any stylist)"),
     "customer": fields.Nested(customer_model),
     "stylist": fields.Nested(stylist_model),
     "service": fields.Nested(service_model),
@@ -35,64 +43,133 @@ booking_model = booking_ns.model("Booking", {
 
 create_model = booking_ns.model("BookingCreate", {
     "customer_id": fields.Integer(required=True, description="Customer ID"),
-    "stylist_id": fields.Integer(required=True, description="Stylist ID"),
+    "stylist_id": fields.Integer(description="Stylist ID; omit to book any stylist offering the service"),
     "service_id": fields.Integer(required=True, description="Service ID"),
     "appointment_time": fields.String(required=True, description="ISO datetime string"),
 })
 
 update_model = booking_ns.model("BookingUpdate", {
+    "status": fields.String(description="pending, confirmed, completed or cancelled"),
     "stylist_id": fields.Integer(description="Update stylist"),
     "service_id": fields.Integer(description="Update service"),
     "appointment_time": fields.String(description="Updated appointment time (ISO)"),
 })
 
+# ----------------- Filters -----------------
+BOOKING_STATUSES = ("pending", "confirmed", "completed", "cancelled")
+
+# Whitelisted sort orders (columns, descending), each backed by an index on the booking table
+SORT_ORDERS = {
+    "appointment_time": (("appointment_time", "id"), False),
+    "-appointment_time": (("appointment_time", "id"), True),
+    "id": (("id",), False),
+    "-id": (("id",), True),
+}
+
+list_parser = booking_ns.parser()
+list_parser.add_argument("stylist_id", type=int, location="args")
+list_parser.add_argument("customer_id", type=int, location="args")
+list_parser.add_argument("status", choices=BOOKING_STATUSES, location="args")
+list_parser.add_argument("from", type=datetime.fromisoformat, dest="start", location="args",
+                         help="Earliest appointment time (ISO)")
+list_parser.add_argument("to", type=datetime.fromisoformat, dest="end", location="args",
+                         help="Latest appointment time, exclusive (ISO)")
+list_parser.add_argument("sort", choices=tuple(SORT_ORDERS), default="appointment_time", location="args")
+list_parser.add_argument("fields", location="args", help=FIELDS_HELP)
+
+
+def filtered_bookings(args, model=Booking):
+    """Translate list arguments into indexed SQL predicates on ``model`` (live or archived bookings)"""
+    query = model.query
+    if args["stylist_id"] is not None:
+        query = query.filter(model.stylist_id == args["stylist_id"])
+    if args["customer_id"] is not None:
+        query = query.filter(model.customer_id == args["customer_id"])
+    if args["status"]:
+        query = query.filter(model.status == args["status"])
+    if args["start"]:
+        query = query.filter(model.appointment_time >= args["start"])
+    if args["end"]:
+        query = query.filter(model.appointment_time < args["end"])
+    columns, descending = SORT_ORDERS[args["sort"]]
+    return query.order_by(*[
+        getattr(model, name).desc() if descending else getattr(model, name).asc() for name in columns
+    ])
+
+
 # ----------------- Routes -----------------
 @booking_ns.route("/")
 class BookingList(Resource):
-    @booking_ns.marshal_list_with(booking_model)
+    @booking_ns.expect(list_parser)
+    @booking_ns.response(200, "Success", [booking_model])
     def get(self):
-        """Get all bookings"""
-        return Booking.query.all()
-
+        """Get bookings, optionally filtered and sorted"""
+        args = list_parser.parse_args()
+        model, tree = sparse_fields(booking_model)
+        columns, descending = SORT_ORDERS[args["sort"]]
+        sources = [Booking, ArchivedBooking] if needs_archive(args["start"], args["status"]) else [Booking]
+
+        bookings = []
+        for source in sources:
+            bookings.extend(
+                filtered_bookings(args, source).options(*sparse_options(source, tree, always=columns, model=model)).all()
+            )
+        if len(sources) > 1:
+            bookings.sort(key=lambda b: tuple(getattr(b, name) for name in columns), reverse=descending)
+        return marshal(bookings, model)
+
+    @limiter.limit("bookings")
     @booking_ns.expect(create_model)
-    @booking_ns.marshal_with(booking_model, code=201)
+    @booking_ns.response(201, "Created", booking_model)
+    @booking_ns.response(409, "No stylist is free at that time")
     def post(self):
         """Create a new booking"""
         data = request.json
 
         customer = Customer.query.get_or_404(data["customer_id"])
-        stylist = Stylist.query.get_or_404(data["stylist_id"])
         service = Service.query.get_or_404(data["service_id"])
 
-        # Ensure stylist offers this service
-        if service not in stylist.services:
-            return {"error": f"Stylist '{stylist.name}' does not offer '{service.title}'"}, 400
-
         # Parse appointment time
         try:
             appointment_time = datetime.fromisoformat(data["appointment_time"])
         except ValueError:
             return {"error": "Invalid datetime format. Use ISO format."}, 400
 
+        auto_assigned = data.get("stylist_id") is None
+        if auto_assigned:
+            # Any stylist: pick the qualified one that leaves the smallest gaps in the day
+            stylist_id = choose_stylist(service, appointment_time)
+            if stylist_id is None:
+                return {"error": f"No stylist offering '{service.title}' is free at that time"}, 409
+        else:
+            stylist = Stylist.query.get_or_404(data["stylist_id"])
+            # Ensure stylist offers this service
+            if service not in stylist.services:
+                return {"error": f"Stylist '{stylist.name}' does not offer '{service.title}'"}, 400
+            stylist_id = stylist.id
+
         new_booking = Booking(
             customer_id=customer.id,
-            stylist_id=stylist.id,
+            stylist_id=stylist_id,
             service_id=service.id,
-            appointment_time=appointment_time
+            appointment_time=appointment_time,
+            auto_assigned=auto_assigned,
         )
 
         db.session.add(new_booking)
         db.session.commit()
-        return new_booking, 201
+        # Marshalled here rather than with marshal_with so error bodies reach the client
+        return marshal(new_booking, booking_model), 201
 
 
 @booking_ns.route("/<int:id>")
 @booking_ns.response(404, "Booking not found")
 class BookingDetail(Resource):
-    @booking_ns.marshal_with(booking_model)
+    @booking_ns.doc(params={"fields": FIELDS_HELP})
+    @booking_ns.response(200, "Success", booking_model)
     def get(self, id):
         """Get booking by ID"""
-        return Booking.query.get_or_404(id)
+        return marshal_sparse(Booking.query.filter_by(id=id), booking_model, one=True)
 
     @booking_ns.expect(update_model)
     @booking_ns.marshal_with(booking_model)
@@ -100,12 +177,17 @@ class BookingDetail(Resource):
         """Update booking details"""
         booking = Booking.query.get_or_404(id)
         data = request.json
+        # The slot held before this update, in case it is given up
+        freed = (booking.stylist_id, booking.service_id, booking.appointment_time)
+        was_active = booking.status in ACTIVE_BOOKING_STATUSES
 
         if "stylist_id" in data:
             stylist = Stylist.query.get_or_404(data["stylist_id"])
             if booking.service not in stylist.services:
                 return {"error": f"Stylist '{stylist.name}' does not offer '{booking.service.title}'"}, 400
             booking.stylist = stylist
+            # The customer picked this stylist; re-optimization must leave it alone
+            booking.auto_assigned = False
 
         if "service_id" in data:
             service = Service.query.get_or_404(data["service_id"])
@@ -119,12 +201,23 @@ class BookingDetail(Resource):
             except ValueError:
                 return {"error": "Invalid datetime format. Use ISO format."}, 400
 
+        if "status" in data:
+            if data["status"] not in BOOKING_STATUSES:
+                return {"error": f"Status must be one of {', '.join(BOOKING_STATUSES)}"}, 400
+            booking.status = data["status"]
+
         db.session.commit()
+        if was_active and booking.status == "cancelled":
+            offer_booking_slot(*freed)
         return booking
 
     def delete(self, id):
         """Delete a booking"""
         booking = Booking.query.get_or_404(id)
+        freed = (booking.stylist_id, booking.service_id, booking.appointment_time)
+        was_active = booking.status in ACTIVE_BOOKING_STATUSES
         db.session.delete(booking)
         db.session.commit()
+        if was_active:
+            offer_booking_slot(*freed)
         return {"message": "Booking deleted"}, 200
@@ -2,6 +2,7 @@ from flask_restx import Namespace, Resource, fields
 from flask import request
 from models import db, Customer
 from flask_bcrypt import Bcrypt
+from ratelimit import limiter
 
 bcrypt = Bcrypt()
 
@@ -31,6 +32,7 @@ class CustomerList(Resource):
         """Get all customers"""
         return Customer.query.all()
 
+    @limiter.limit("customers")
     @customer_ns.expect(customer_model)
     @customer_ns.marshal_with(customer_model, code=201)
     def post(self):
@@ -0,0 +1,27 @@
+from flask_restx import Namespace, Resource
+from flask import abort, send_file
+import os
+from thumbnails import HASH_RE, NAME_RE, media_path
+
+# Namespace
+media_ns = Namespace("media", description="Uploaded images and thumbnails")
+
+# Paths are content addressed, so a given URL never changes
+CACHE_SECONDS = 365 * 24 * 3600
+
+
+# ----------------- Routes -----------------
+@media_ns.route("/<string:digest>/<string:name>")
+@media_ns.response(404, "Image not found")
+class MediaFile(Resource):
+    def get(self, digest, name):
+        """Serve a stored image with long-lived cache headers"""
+        if not HASH_RE.match(digest) or not NAME_RE.match(name):
+            abort(404)
+        path = media_path(digest, name)
+        if not os.path.exists(path):
+            abort(404)
+        response = send_file(path, max_age=CACHE_SECONDS, etag=digest + name, conditional=True)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
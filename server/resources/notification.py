@@ -0,0 +1,102 @@
+from flask_restx import Namespace, Resource, fields, inputs
+from flask import request
+from datetime import datetime
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select, update
+from models import db, Customer, Notification, bump_customer
+
+# Namespace
+notification_ns = Namespace("notifications", description="Customer notification inbox")
+
+# ----------------- Models -----------------
+notification_model = notification_ns.model("Notification", {
+    "id": fields.Integer(readonly=True),
+    "message": fields.String,
+    "type": fields.String(description="reminder, offer or system"),
+    "status": fields.String(description="unread, read or sent"),
+    "created_at": fields.DateTime,
+    "booking_id": fields.Integer,
+})
+
+notification_page_model = notification_ns.model("NotificationPage", {
+    "items": fields.List(fields.Nested(notification_model)),
+    "page": fields.Integer,
+    "per_page": fields.Integer,
+    "total": fields.Integer,
+    "pages": fields.Integer,
+    "unread": fields.Integer,
+})
+
+mark_read_model = notification_ns.model("MarkRead", {
+    "ids": fields.List(fields.Integer, description="Notifications to mark as read"),
+    "before": fields.String(description="Or: mark everything created up to this time (ISO)"),
+})
+
+inbox_parser = notification_ns.parser()
+inbox_parser.add_argument("unread", type=inputs.boolean, location="args", help="Only unread notifications")
+
+
+def unread_count(customer_id):
+    """Badge count from the maintained counter, no COUNT(*)"""
+    return db.session.scalar(select(Customer.unread_notifications).where(Customer.id == customer_id)) or 0
+
+
+# ----------------- Routes -----------------
+@notification_ns.route("")
+class NotificationList(Resource):
+    @jwt_required()
+    @notification_ns.expect(inbox_parser)
+    @notification_ns.marshal_with(notification_page_model)
+    def get(self):
+        """Get the current customer's notifications, newest first"""
+        customer_id = int(get_jwt_identity())
+        query = Notification.query.filter_by(customer_id=customer_id)
+        if inbox_parser.parse_args()["unread"]:
+            query = query.filter_by(status="unread")
+        page = db.paginate(
+            query.order_by(Notification.created_at.desc(), Notification.id.desc()),
+            max_per_page=100,
+        )
+        return {
+            "items": page.items,
+            "page": page.page,
+            "per_page": page.per_page,
+            "total": page.total,
+            "pages": page.pages,
+            "unread": unread_count(customer_id),
+        }
+
+
+@notification_ns.route("/unread-count")
+class UnreadCount(Resource):
+    @jwt_required()
+    def get(self):
+        """Number of unread notifications for the badge"""
+        return {"unread": unread_count(int(get_jwt_identity()))}, 200
+
+
+@notification_ns.route("/mark-read")
+class MarkRead(Resource):
+    @jwt_required()
+    @notification_ns.expect(mark_read_model)
+    def post(self):
+        """Mark notifications as read by ids or everything up to a timestamp, in one UPDATE"""
+        customer_id = int(get_jwt_identity())
+        data = request.json or {}
+        table = Notification.__table__
+        criteria = [table.c.customer_id == customer_id, table.c.status == "unread"]
+        if data.get("ids"):
+            criteria.append(table.c.id.in_(data["ids"]))
+        elif data.get("before"):
+            try:
+                criteria.append(table.c.created_at <= datetime.fromisoformat(data["before"]))
+            except ValueError:
+                return {"error": "Invalid datetime format. Use ISO format."}, 400
+        else:
+            return {"error": "Provide 'ids' or 'before'"}, 400
+
+        marked = db.session.execute(update(table).where(*criteria).values(status="read")).rowcount
+        # Bulk updates skip the ORM listeners, so keep the unread counter in step here
+        bump_customer(db.session.connection(), customer_id, unread_notifications=-marked)
+        db.session.commit()
+        return {"marked": marked, "unread": unread_count(customer_id)}, 200
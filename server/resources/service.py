@@ -1,6 +1,10 @@
 from flask_restx import Namespace, Resource, fields
 from flask import request
+from datetime import datetime
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from models import db, Service, Stylist
+from recommend import recommend_stylists
+from qualifications import AssignmentError, link, unlink, set_stylists, stylists_of
 
 # Namespace
 service_ns = Namespace("services", description="Service related operations")
@@ -17,6 +21,8 @@ service_model = service_ns.model("Service", {
     "title": fields.String(required=True, description="Service title"),
     "description": fields.String(description="Service description"),
     "price": fields.Float(required=True, description="Price of the service"),
+    "duration_minutes": fields.Integer(description="Length of the appointment in minutes", default=60),
+    "branch_id": fields.Integer(readonly=True, description="Branch offering the service"),
     "stylists": fields.List(fields.Nested(stylist_model))
 })
 
@@ -24,8 +30,32 @@ update_model = service_ns.model("ServiceUpdate", {
     "title": fields.String(description="Updated title"),
     "description": fields.String(description="Updated description"),
     "price": fields.Float(description="Updated price"),
+    "duration_minutes": fields.Integer(description="Updated duration in minutes"),
 })
 
+stylist_ids_model = service_ns.model("ServiceStylistIds", {
+    "stylist_ids": fields.List(fields.Integer, required=True, description="The complete set of stylists offering it"),
+})
+
+stylist_changes_model = service_ns.model("ServiceStylistChanges", {
+    "add": fields.List(fields.Integer, description="Stylist ids to start offering it"),
+    "remove": fields.List(fields.Integer, description="Stylist ids to stop offering it"),
+})
+
+recommended_model = service_ns.model("RecommendedStylist", {
+    "id": fields.Integer,
+    "name": fields.String,
+    "score": fields.Float(description="Higher is better, between 0 and 1"),
+    "rating": fields.Float(description="Smoothed average rating"),
+    "reviews": fields.Integer,
+    "active_bookings": fields.Integer(description="Pending and confirmed bookings"),
+    "available": fields.Boolean(description="Free for the whole appointment"),
+})
+
+recommend_parser = service_ns.parser()
+recommend_parser.add_argument("at", type=datetime.fromisoformat, required=True, location="args",
+                              help="Requested appointment time (ISO)")
+
 
 # ----------------- Routes -----------------
 @service_ns.route("/")
@@ -43,7 +73,8 @@ class ServiceList(Resource):
         new_service = Service(
             title=data["title"],
             description=data.get("description"),
-            price=data["price"]
+            price=data["price"],
+            duration_minutes=data.get("duration_minutes", 60)
         )
         db.session.add(new_service)
         db.session.commit()
@@ -71,6 +102,8 @@ class ServiceDetail(Resource):
             service.description = data["description"]
         if "price" in data:
             service.price = data["price"]
+        if "duration_minutes" in data:
+            service.duration_minutes = data["duration_minutes"]
 
         db.session.commit()
         return service
@@ -99,7 +132,10 @@ class ServiceStylists(Resource):
         stylist_id = data.get("stylist_id")
 
         stylist = Stylist.query.get_or_404(stylist_id)
-        service.stylists.append(stylist)
+        try:
+            link([stylist.id], [service.id])
+        except AssignmentError as e:
+            return {"error": str(e)}, 400
 
         db.session.commit()
         return {"message": f"Stylist {stylist.name} added to service {service.title}"}, 200
@@ -111,8 +147,46 @@ class ServiceStylists(Resource):
         stylist_id = data.get("stylist_id")
 
         stylist = Stylist.query.get_or_404(stylist_id)
-        if stylist in service.stylists:
-            service.stylists.remove(stylist)
+        if unlink([stylist.id], [service.id]):
             db.session.commit()
             return {"message": f"Stylist {stylist.name} removed from service {service.title}"}, 200
         return {"message": "Stylist not assigned to this service"}, 400
+
+    @service_ns.expect(stylist_ids_model)
+    def put(self, id):
+        """Replace the set of stylists offering a service"""
+        Service.query.get_or_404(id)
+        try:
+            stylist_ids = set_stylists(id, request.json.get("stylist_ids"))
+        except AssignmentError as e:
+            return {"error": str(e)}, 400
+        db.session.commit()
+        return {"service_id": id, "stylist_ids": stylist_ids}, 200
+
+    @service_ns.expect(stylist_changes_model)
+    def patch(self, id):
+        """Add and remove stylists offering a service"""
+        Service.query.get_or_404(id)
+        data = request.json
+        try:
+            removed = unlink(data.get("remove"), [id])
+            added = link(data.get("add"), [id])
+        except AssignmentError as e:
+            return {"error": str(e)}, 400
+        db.session.commit()
+        return {"service_id": id, "added": added, "removed": removed, "stylist_ids": stylists_of(id)}, 200
+
+
+# ----------------- Recommendations -----------------
+@service_ns.route("/<int:id>/recommended-stylists")
+@service_ns.response(404, "Service not found")
+class RecommendedStylists(Resource):
+    @service_ns.expect(recommend_parser)
+    @service_ns.marshal_list_with(recommended_model)
+    def get(self, id):
+        """Rank stylists offering this service for the requested time"""
+        args = recommend_parser.parse_args()
+        service = Service.query.get_or_404(id)
+        verify_jwt_in_request(optional=True)
+        customer_id = get_jwt_identity()
+        return recommend_stylists(service, args["at"], int(customer_id) if customer_id else None)
@@ -0,0 +1,60 @@
+from flask_restx import Namespace, Resource
+from flask import Response, current_app, request
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import queue
+from models import db, Customer
+from stream import hub, booking_events, sse_message, MAX_BACKLOG
+from tenancy import current_branch_id
+
+# Namespace
+stream_ns = Namespace("stream", description="Live server-sent event streams")
+
+stream_parser = stream_ns.parser()
+stream_parser.add_argument("stylist_id", type=int, location="args", help="Only this stylist's bookings")
+stream_parser.add_argument("Last-Event-ID", type=int, location="headers", help="Resume after this event")
+
+KEEPALIVE_SECONDS = 15
+
+
+# ----------------- Routes -----------------
+@stream_ns.route("/bookings")
+class BookingStream(Resource):
+    @jwt_required()
+    @stream_ns.expect(stream_parser)
+    @stream_ns.produces(["text/event-stream"])
+    def get(self):
+        """Stream booking created/updated/deleted events as they commit (admins only, like /changes)"""
+        user = db.session.get(Customer, get_jwt_identity())
+        if not user or not user.is_admin:
+            return {"error": "Admin access required"}, 403
+        args = stream_parser.parse_args()
+        last_id = args["Last-Event-ID"] or request.args.get("lastEventId", type=int)
+        sub = hub.subscribe(current_app._get_current_object(), args["stylist_id"], current_branch_id())
+
+        # Subscribed first so nothing committed meanwhile is lost; duplicates are skipped by seq
+        backlog = []
+        if last_id is not None:
+            backlog = [(e.seq, sse_message(e)) for e in booking_events(last_id, MAX_BACKLOG) if sub.wants(e)]
+
+        replayed = {seq for seq, _ in backlog}
+
+        def events():
+            try:
+                yield "retry: 3000\n\n"
+                for _, message in backlog:
+                    yield message
+                while not sub.dropped:
+                    try:
+                        seq, message = sub.queue.get(timeout=KEEPALIVE_SECONDS)
+                    except queue.Empty:
+                        yield ": keepalive\n\n"
+                        continue
+                    if seq not in replayed:
+                        yield message
+            finally:
+                hub.unsubscribe(sub)
+
+        return Response(events(), mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
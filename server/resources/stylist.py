@@ -1,6 +1,14 @@
 from flask_restx import Namespace, Resource, fields
 from flask import request
-from models import db, Stylist, Service
+from werkzeug.datastructures import FileStorage
+from datetime import datetime, timedelta
+from sqlalchemy import func, literal_column
+from sqlalchemy.orm import joinedload, load_only
+from models import db, Stylist, Service, Booking, Portfolio, ArchivedBooking
+from archive import needs_archive
+from thumbnails import InvalidImage, ingest, media_url, thumbnail_urls
+from fieldsets import FIELDS_HELP, marshal_sparse
+from qualifications import AssignmentError, link, unlink, set_services, services_of
 
 # Create namespace
 stylist_ns = Namespace("stylists", description="Stylist related operations")
@@ -17,6 +25,7 @@ stylist_model = stylist_ns.model("Stylist", {
     "id": fields.Integer(readonly=True, description="Stylist ID"),
     "name": fields.String(required=True, description="Stylist name"),
     "bio": fields.String(description="Short bio"),
+    "branch_id": fields.Integer(readonly=True, description="Branch the stylist works at"),
     "services": fields.List(fields.Nested(service_model))
 })
 
@@ -25,14 +34,97 @@ update_model = stylist_ns.model("StylistUpdate", {
     "bio": fields.String(description="Updated bio"),
 })
 
+calendar_service_model = stylist_ns.model("CalendarService", {
+    "id": fields.Integer,
+    "title": fields.String,
+    "duration_minutes": fields.Integer,
+})
+
+calendar_booking_model = stylist_ns.model("CalendarBooking", {
+    "id": fields.Integer,
+    "appointment_time": fields.DateTime,
+    "status": fields.String,
+    "customer_id": fields.Integer,
+    "service": fields.Nested(calendar_service_model),
+})
+
+calendar_bucket_model = stylist_ns.model("CalendarBucket", {
+    "start": fields.String(description="First day of the bucket (ISO date)"),
+    "bookings": fields.Integer(description="Non-cancelled bookings in the bucket"),
+    "booked_minutes": fields.Integer(description="Sum of service durations"),
+})
+
+calendar_model = stylist_ns.model("StylistCalendar", {
+    "from": fields.DateTime,
+    "to": fields.DateTime,
+    "granularity": fields.String,
+    "buckets": fields.List(fields.Nested(calendar_bucket_model)),
+    "bookings": fields.List(fields.Nested(calendar_booking_model)),
+})
+
+service_ids_model = stylist_ns.model("StylistServiceIds", {
+    "service_ids": fields.List(fields.Integer, required=True, description="The stylist's complete set of services"),
+})
+
+service_changes_model = stylist_ns.model("StylistServiceChanges", {
+    "add": fields.List(fields.Integer, description="Service ids to offer"),
+    "remove": fields.List(fields.Integer, description="Service ids to stop offering"),
+})
+
+bulk_services_model = stylist_ns.inherit("BulkStylistServiceChanges", service_changes_model, {
+    "stylist_ids": fields.List(fields.Integer, required=True, description="Stylists to change"),
+})
+
+portfolio_item_model = stylist_ns.model("PortfolioItem", {
+    "id": fields.Integer(readonly=True),
+    "description": fields.String,
+    "created_at": fields.DateTime,
+    "image_url": fields.String(description="Full size image"),
+    "thumbnails": fields.Raw(description="Thumbnail URL per size in pixels"),
+})
+
+portfolio_page_model = stylist_ns.model("PortfolioPage", {
+    "items": fields.List(fields.Nested(portfolio_item_model)),
+    "page": fields.Integer,
+    "per_page": fields.Integer,
+    "total": fields.Integer,
+    "pages": fields.Integer,
+})
+
+portfolio_upload_parser = stylist_ns.parser()
+portfolio_upload_parser.add_argument("image", type=FileStorage, location="files", required=True)
+portfolio_upload_parser.add_argument("description", location="form")
+
+MAX_PORTFOLIO_UPLOAD = 10 * 1024 * 1024
+
+calendar_parser = stylist_ns.parser()
+calendar_parser.add_argument("from", type=datetime.fromisoformat, dest="start", required=True, location="args",
+                             help="Window start (ISO)")
+calendar_parser.add_argument("to", type=datetime.fromisoformat, dest="end", required=True, location="args",
+                             help="Window end, exclusive (ISO)")
+calendar_parser.add_argument("granularity", choices=("day", "week"), default="day", location="args")
+
+MAX_CALENDAR_WINDOW = timedelta(days=92)
+
+
+def calendar_bucket(column, granularity):
+    """SQL expression truncating a datetime column to the start of its day/week (weeks start Monday)"""
+    if db.engine.dialect.name == "postgresql":
+        # Inlined rather than bound so SELECT and GROUP BY render the same expression
+        return func.date_trunc(literal_column(f"'{granularity}'"), column)
+    if granularity == "week":
+        return func.date(column, "weekday 0", "-6 days")
+    return func.date(column)
+
 
 # ----------------- Routes -----------------
 @stylist_ns.route("/")
 class StylistList(Resource):
-    @stylist_ns.marshal_list_with(stylist_model)
+    @stylist_ns.doc(params={"fields": FIELDS_HELP})
+    @stylist_ns.response(200, "Success", [stylist_model])
     def get(self):
         """Get all stylists"""
-        return Stylist.query.all()
+        return marshal_sparse(Stylist.query, stylist_model)
 
     @stylist_ns.expect(stylist_model)
     @stylist_ns.marshal_with(stylist_model, code=201)
@@ -51,11 +143,11 @@ class StylistList(Resource):
 @stylist_ns.route("/<int:id>")
 @stylist_ns.response(404, "Stylist not found")
 class StylistDetail(Resource):
-    @stylist_ns.marshal_with(stylist_model)
+    @stylist_ns.doc(params={"fields": FIELDS_HELP})
+    @stylist_ns.response(200, "Success", stylist_model)
     def get(self, id):
         """Get stylist by ID"""
-        stylist = Stylist.query.get_or_404(id)
-        return stylist
+        return marshal_sparse(Stylist.query.filter_by(id=id), stylist_model, one=True)
 
     @stylist_ns.expect(update_model)
     @stylist_ns.marshal_with(stylist_model)
@@ -96,7 +188,10 @@ class StylistServices(Resource):
         service_id = data.get("service_id")
 
         service = Service.query.get_or_404(service_id)
-        stylist.services.append(service)
+        try:
+            link([stylist.id], [service.id])
+        except AssignmentError as e:
+            return {"error": str(e)}, 400
 
         db.session.commit()
         return {"message": f"Service {service.title} added to stylist {stylist.name}"}, 200
@@ -108,8 +203,159 @@ class StylistServices(Resource):
         service_id = data.get("service_id")
 
         service = Service.query.get_or_404(service_id)
-        if service in stylist.services:
-            stylist.services.remove(service)
+        if unlink([stylist.id], [service.id]):
             db.session.commit()
             return {"message": f"Service {service.title} removed from stylist {stylist.name}"}, 200
         return {"message": "Service not assigned to this stylist"}, 400
+
+    @stylist_ns.expect(service_ids_model)
+    def put(self, id):
+        """Replace the set of services a stylist offers"""
+        Stylist.query.get_or_404(id)
+        try:
+            service_ids = set_services(id, request.json.get("service_ids"))
+        except AssignmentError as e:
+            return {"error": str(e)}, 400
+        db.session.commit()
+        return {"stylist_id": id, "service_ids": service_ids}, 200
+
+    @stylist_ns.expect(service_changes_model)
+    def patch(self, id):
+        """Add and remove services for a stylist"""
+        Stylist.query.get_or_404(id)
+        data = request.json
+        try:
+            removed = unlink([id], data.get("remove"))
+            added = link([id], data.get("add"))
+        except AssignmentError as e:
+            return {"error": str(e)}, 400
+        db.session.commit()
+        return {"stylist_id": id, "added": added, "removed": removed, "service_ids": services_of(id)}, 200
+
+
+@stylist_ns.route("/services")
+class BulkStylistServices(Resource):
+    @stylist_ns.expect(bulk_services_model)
+    def patch(self):
+        """Add and remove services for many stylists at once (e.g. onboarding a branch)"""
+        data = request.json
+        try:
+            removed = unlink(data.get("stylist_ids"), data.get("remove"))
+            added = link(data.get("stylist_ids"), data.get("add"))
+        except AssignmentError as e:
+            return {"error": str(e)}, 400
+        db.session.commit()
+        return {"added": added, "removed": removed}, 200
+
+
+# ----------------- Calendar -----------------
+@stylist_ns.route("/<int:id>/calendar")
+@stylist_ns.response(404, "Stylist not found")
+class StylistCalendar(Resource):
+    @stylist_ns.expect(calendar_parser)
+    @stylist_ns.marshal_with(calendar_model)
+    def get(self, id):
+        """Get a stylist's bookings and per-day/week load within a window"""
+        args = calendar_parser.parse_args()
+        start, end = args["start"], args["end"]
+        if end <= start or end - start > MAX_CALENDAR_WINDOW:
+            stylist_ns.abort(400, f"Window must be positive and at most {MAX_CALENDAR_WINDOW.days} days")
+        Stylist.query.get_or_404(id)
+
+        buckets, bookings = {}, []
+        sources = [ArchivedBooking, Booking] if needs_archive(start) else [Booking]
+        for source in sources:
+            in_window = (
+                (source.stylist_id == id)
+                & (source.appointment_time >= start)
+                & (source.appointment_time < end)
+            )
+            bucket = calendar_bucket(source.appointment_time, args["granularity"]).label("bucket")
+            rows = db.session.execute(
+                db.select(bucket, func.count(source.id), func.coalesce(func.sum(Service.duration_minutes), 0))
+                .join(Service, Service.id == source.service_id)
+                .where(in_window, source.status != "cancelled")
+                .group_by(bucket)
+            ).all()
+            for value, count, minutes in rows:
+                key = value if isinstance(value, str) else value.date().isoformat()
+                total = buckets.setdefault(key, {"start": key, "bookings": 0, "booked_minutes": 0})
+                total["bookings"] += count
+                total["booked_minutes"] += minutes
+
+            bookings.extend(
+                source.query
+                .options(
+                    load_only(source.id, source.appointment_time, source.status, source.customer_id),
+                    joinedload(source.service).load_only(Service.id, Service.title, Service.duration_minutes),
+                )
+                .filter(in_window)
+                .order_by(source.appointment_time)
+                .all()
+            )
+        if len(sources) > 1:
+            bookings.sort(key=lambda b: b.appointment_time)
+
+        return {
+            "from": start,
+            "to": end,
+            "granularity": args["granularity"],
+            "buckets": [buckets[key] for key in sorted(buckets)],
+            "bookings": bookings,
+        }
+
+
+# ----------------- Portfolio -----------------
+def portfolio_item(item):
+    return {
+        "id": item.id,
+        "description": item.description,
+        "created_at": item.created_at,
+        "image_url": item.image_url,
+        "thumbnails": thumbnail_urls(item.content_hash) if item.content_hash else None,
+    }
+
+
+@stylist_ns.route("/<int:id>/portfolio")
+@stylist_ns.response(404, "Stylist not found")
+class StylistPortfolio(Resource):
+    @stylist_ns.marshal_with(portfolio_page_model)
+    def get(self, id):
+        """Get a stylist's portfolio, newest first, with thumbnail URLs"""
+        Stylist.query.get_or_404(id)
+        page = db.paginate(
+            Portfolio.query
+            .filter_by(stylist_id=id)
+            .order_by(Portfolio.created_at.desc(), Portfolio.id.desc()),
+            max_per_page=60,
+        )
+        return {
+            "items": [portfolio_item(item) for item in page.items],
+            "page": page.page,
+            "per_page": page.per_page,
+            "total": page.total,
+            "pages": page.pages,
+        }
+
+    @stylist_ns.expect(portfolio_upload_parser)
+    def post(self, id):
+        """Upload a portfolio image; thumbnails are rendered on ingest"""
+        stylist = Stylist.query.get_or_404(id)
+        args = portfolio_upload_parser.parse_args()
+        data = args["image"].read(MAX_PORTFOLIO_UPLOAD + 1)
+        if len(data) > MAX_PORTFOLIO_UPLOAD:
+            return {"error": "Image too large"}, 413
+        try:
+            digest, original = ingest(data)
+        except InvalidImage as e:
+            return {"error": str(e)}, e.status
+
+        item = Portfolio(
+            stylist_id=stylist.id,
+            image_url=media_url(digest, original),
+            content_hash=digest,
+            description=args["description"],
+        )
+        db.session.add(item)
+        db.session.commit()
+        return stylist_ns.marshal(portfolio_item(item), portfolio_item_model), 201
@@ -0,0 +1,113 @@
+from flask_restx import Namespace, Resource, fields
+from flask import request
+from datetime import datetime
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import db, WaitlistEntry, Service, Stylist
+from waitlist import accept_offer, offer_freed_slot
+
+# Namespace
+waitlist_ns = Namespace("waitlist", description="Waitlist for fully booked slots")
+
+# ----------------- Models -----------------
+entry_model = waitlist_ns.model("WaitlistEntry", {
+    "id": fields.Integer(readonly=True),
+    "service_id": fields.Integer(required=True, description="Wanted service"),
+    "stylist_id": fields.Integer(description="Preferred stylist, omit for any"),
+    "window_start": fields.DateTime(required=True, description="Earliest acceptable start"),
+    "window_end": fields.DateTime(required=True, description="Latest acceptable start"),
+    "status": fields.String(readonly=True, description="waiting, offered, booked, expired or cancelled"),
+    "created_at": fields.DateTime(readonly=True),
+    "offered_stylist_id": fields.Integer(readonly=True),
+    "offered_time": fields.DateTime(readonly=True),
+    "offer_expires_at": fields.DateTime(readonly=True),
+    "booking_id": fields.Integer(readonly=True),
+})
+
+create_model = waitlist_ns.model("WaitlistCreate", {
+    "service_id": fields.Integer(required=True, description="Wanted service"),
+    "stylist_id": fields.Integer(description="Preferred stylist, omit for any"),
+    "window_start": fields.String(required=True, description="Earliest acceptable start (ISO)"),
+    "window_end": fields.String(required=True, description="Latest acceptable start (ISO)"),
+})
+
+
+def own_entry(id):
+    entry = WaitlistEntry.query.get_or_404(id)
+    if entry.customer_id != int(get_jwt_identity()):
+        waitlist_ns.abort(403, "Not your waitlist entry")
+    return entry
+
+
+# ----------------- Routes -----------------
+@waitlist_ns.route("/")
+class WaitlistList(Resource):
+    @jwt_required()
+    @waitlist_ns.marshal_list_with(entry_model)
+    def get(self):
+        """Get the current customer's waitlist entries"""
+        return (
+            WaitlistEntry.query
+            .filter_by(customer_id=int(get_jwt_identity()))
+            .order_by(WaitlistEntry.created_at.desc())
+            .all()
+        )
+
+    @jwt_required()
+    @waitlist_ns.expect(create_model)
+    def post(self):
+        """Join the waitlist for a service (and optionally a stylist) within a time window"""
+        data = request.json
+        service = Service.query.get_or_404(data["service_id"])
+        stylist_id = data.get("stylist_id")
+        if stylist_id is not None:
+            stylist = Stylist.query.get_or_404(stylist_id)
+            if service not in stylist.services:
+                return {"error": f"Stylist '{stylist.name}' does not offer '{service.title}'"}, 400
+        try:
+            window_start = datetime.fromisoformat(data["window_start"])
+            window_end = datetime.fromisoformat(data["window_end"])
+        except ValueError:
+            return {"error": "Invalid datetime format. Use ISO format."}, 400
+        if window_end < window_start:
+            return {"error": "window_end must not be before window_start"}, 400
+
+        entry = WaitlistEntry(
+            customer_id=int(get_jwt_identity()),
+            service_id=service.id,
+            stylist_id=stylist_id,
+            window_start=window_start,
+            window_end=window_end,
+        )
+        db.session.add(entry)
+        db.session.commit()
+        return waitlist_ns.marshal(entry, entry_model), 201
+
+
+@waitlist_ns.route("/<int:id>")
+@waitlist_ns.response(404, "Waitlist entry not found")
+class WaitlistDetail(Resource):
+    @jwt_required()
+    @waitlist_ns.response(409, "Entry already booked")
+    def delete(self, id):
+        """Leave the waitlist, passing any slot held for the entry to the next waiter"""
+        entry = own_entry(id)
+        if entry.status == "booked":
+            return {"error": "Entry already booked; cancel the booking instead"}, 409
+        held = entry.status == "offered"
+        entry.status = "cancelled"
+        db.session.commit()
+        if held:
+            offer_freed_slot(entry.offered_stylist_id, entry.offered_time, entry.service.duration_minutes)
+        return {"message": "Waitlist entry cancelled"}, 200
+
+
+@waitlist_ns.route("/<int:id>/accept")
+@waitlist_ns.response(404, "Waitlist entry not found")
+class WaitlistAccept(Resource):
+    @jwt_required()
+    def post(self, id):
+        """Accept an offered slot and turn it into a booking"""
+        booking, error = accept_offer(own_entry(id))
+        if error:
+            return {"error": error}, 409
+        return {"message": "Slot booked", "booking_id": booking.id}, 201
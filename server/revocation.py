@@ -0,0 +1,108 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select
+from models import db, RevokedToken
+
+BLOOM_BITS = 1 << 20  # 128 KiB per worker; ~1% false positives at 100k revocations
+BLOOM_HASHES = 7
+
+
+class BloomFilter:
+    def __init__(self, bits=BLOOM_BITS, hashes=BLOOM_HASHES):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray(bits // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "little")
+        b = int.from_bytes(digest[8:], "little") | 1
+        return [(a + i * b) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.array[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+def subject_key(customer_id):
+    """Revocation key covering every token a customer was issued before its ``revoked_at``"""
+    return f"sub:{customer_id}"
+
+
+class RevocationList:
+    """Per-worker Bloom filter over revoked_token, refreshed by re-reading rows revoked since the last sync.
+
+    A miss proves the token was not revoked as of the last refresh, so most
+    requests never touch the database; hits are confirmed with a primary key
+    lookup because the filter has false positives and never forgets entries.
+    """
+
+    def __init__(self):
+        self.bloom = BloomFilter()
+        self.synced_at = None
+        self.checked = 0.0
+        self.built = 0.0
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        interval = current_app.config.get("REVOCATION_REFRESH_SECONDS", 2)
+        if time.monotonic() - self.checked < interval:
+            return
+        with self._lock:
+            if time.monotonic() - self.checked < interval:
+                return
+            # Expired revocations only ever leave the filter through a rebuild
+            if time.monotonic() - self.built >= current_app.config.get("REVOCATION_REBUILD_SECONDS", 3600):
+                self.bloom, self.synced_at, self.built = BloomFilter(), None, time.monotonic()
+            query = select(RevokedToken.key, RevokedToken.revoked_at)
+            if self.synced_at is None:
+                now = datetime.utcnow()
+                query = query.where((RevokedToken.expires_at.is_(None)) | (RevokedToken.expires_at > now))
+            else:
+                # Small overlap so rows committed out of timestamp order are not missed
+                query = query.where(RevokedToken.revoked_at >= self.synced_at - timedelta(seconds=5))
+            for key, revoked_at in db.session.execute(query):
+                self.bloom.add(key)
+                if self.synced_at is None or revoked_at > self.synced_at:
+                    self.synced_at = revoked_at
+            if self.synced_at is None:
+                self.synced_at = datetime.utcnow()
+            self.checked = time.monotonic()
+
+    def is_revoked(self, payload):
+        self._sync()
+        keys = [key for key in (payload.get("jti"), subject_key(payload.get("sub"))) if key in self.bloom]
+        if not keys:
+            return False
+        now = datetime.utcnow()
+        rows = db.session.execute(
+            select(RevokedToken.key, RevokedToken.revoked_at)
+            .where(RevokedToken.key.in_(keys))
+            .where((RevokedToken.expires_at.is_(None)) | (RevokedToken.expires_at > now))
+        ).all()
+        issued_at = datetime.utcfromtimestamp(payload["iat"]) if "iat" in payload else None
+        # A subject revocation only covers tokens issued before it, so re-enabled accounts can sign in again
+        return any(
+            key == payload.get("jti") or issued_at is None or issued_at < revoked_at
+            for key, revoked_at in rows
+        )
+
+    def revoke(self, key, expires_at=None):
+        """Record a revocation; it is visible to this worker at once and to others after their next refresh"""
+        db.session.merge(RevokedToken(key=key, expires_at=expires_at, revoked_at=datetime.utcnow()))
+        db.session.commit()
+        self.bloom.add(key)
+
+    def revoke_subject(self, customer_id):
+        """Revoke every token issued to a customer so far; kept until the newest of them has expired"""
+        lifetime = current_app.config.get("JWT_ACCESS_TOKEN_EXPIRES")
+        self.revoke(subject_key(customer_id), datetime.utcnow() + lifetime if lifetime else None)
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,28 @@
+from datetime import timedelta
+from sqlalchemy import select
+from models import db, Booking, Service, ACTIVE_BOOKING_STATUSES
+
+# Bookings starting this long before a slot can still run into it
+LONGEST_SERVICE = timedelta(hours=8)
+
+
+def overlaps(start, minutes, other_start, other_minutes):
+    return start < other_start + timedelta(minutes=other_minutes) and other_start < start + timedelta(minutes=minutes)
+
+
+def slot_is_free(stylist_id, start, minutes, exclude_booking_id=None):
+    """True when the stylist has no pending/confirmed booking overlapping [start, start + minutes)"""
+    query = (
+        select(Booking.id, Booking.appointment_time, Service.duration_minutes)
+        .join(Service, Service.id == Booking.service_id)
+        .where(
+            Booking.stylist_id == stylist_id,
+            Booking.appointment_time > start - LONGEST_SERVICE,
+            Booking.appointment_time < start + timedelta(minutes=minutes),
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES),
+        )
+    )
+    return not any(
+        booking_id != exclude_booking_id and overlaps(start, minutes, other_start, other_minutes)
+        for booking_id, other_start, other_minutes in db.session.execute(query)
+    )
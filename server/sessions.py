@@ -0,0 +1,38 @@
+from flask import current_app, request
+from sqlalchemy import event
+from tenancy import BranchSession
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def writes(fn):
+    """Mark a GET handler that writes (housekeeping on read), so it keeps a read-write session"""
+    fn.session_writes = True
+    return fn
+
+
+def _handler_writes():
+    view = current_app.view_functions.get(request.endpoint)
+    handler = getattr(getattr(view, "view_class", None), request.method.lower(), None)
+    return getattr(handler, "session_writes", False)
+
+
+def apply_session_policy(session):
+    """Tune this request's session to what the handler does.
+
+    Reads: no autoflush (nothing to flush) and, on PostgreSQL, a READ ONLY
+    transaction. Writes: objects are not expired on commit, so handlers
+    returning what they just saved do not reload every attribute and
+    relationship; ids and server defaults already come back through
+    INSERT ... RETURNING.
+    """
+    read_only = request.method in READ_METHODS and not _handler_writes()
+    session.info["read_only"] = read_only
+    session.autoflush = not read_only
+    session.expire_on_commit = read_only
+
+
+@event.listens_for(BranchSession, "after_begin")
+def _read_only_transaction(session, transaction, connection):
+    if session.info.get("read_only") and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("SET TRANSACTION READ ONLY")
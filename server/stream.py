@@ -0,0 +1,148 @@
+import json
+import os
+import queue
+import select
+import threading
+from collections import deque
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+from models import db, Booking, OutboxEvent, BOOKING_CHANNEL
+
+# How often the hub re-reads the outbox without a wake-up; this is what carries
+# changes between workers when there is no LISTEN/NOTIFY (e.g. SQLite)
+POLL_SECONDS = 1.0
+# Seqs below the last one seen that are re-read on every wake-up, for
+# transactions that committed a lower seq after a higher one
+SEQ_OVERLAP = 50
+MAX_BACKLOG = 500
+SUBSCRIBER_QUEUE = 1000
+
+
+def sse_message(event):
+    """Encode an outbox event once, for every subscriber"""
+    data = json.dumps(event.payload, separators=(",", ":"))
+    return f"id: {event.seq}\nevent: booking.{event.action}\ndata: {data}\n\n"
+
+
+def booking_events(after, limit):
+    return (
+        OutboxEvent.query
+        .filter(OutboxEvent.seq > after, OutboxEvent.entity == Booking.__tablename__)
+        .order_by(OutboxEvent.seq)
+        .limit(limit)
+        .all()
+    )
+
+
+class Subscriber:
+    def __init__(self, stylist_id, branch_id=None):
+        self.stylist_id = stylist_id
+        self.branch_id = branch_id
+        self.queue = queue.Queue(SUBSCRIBER_QUEUE)
+        self.dropped = False
+
+    def wants(self, event):
+        return (
+            (self.stylist_id is None or event.payload.get("stylist_id") == self.stylist_id)
+            and (self.branch_id is None or event.payload.get("branch_id") == self.branch_id)
+        )
+
+
+class StreamHub:
+    """One per worker: a single thread reads new booking events and fans them out.
+
+    However many dashboards are connected, a worker runs one outbox query per
+    change (or per POLL_SECONDS), instead of every screen polling /bookings.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.last_seq = None
+        self._seen = deque(maxlen=SEQ_OVERLAP * 4)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_w, False)
+
+    def wake(self):
+        try:
+            os.write(self._wake_w, b"\0")
+        except BlockingIOError:
+            pass  # a wake-up is already pending
+
+    def subscribe(self, app, stylist_id, branch_id=None):
+        sub = Subscriber(stylist_id, branch_id)
+        with self._lock:
+            self.subscribers.add(sub)
+            if self._thread is None or not self._thread.is_alive():
+                # Started lazily so it runs in the worker process, not the preforking master
+                self._thread = threading.Thread(target=self._run, args=(app,), daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self.subscribers.discard(sub)
+
+    def _listen(self):
+        """Dedicated LISTEN connection on PostgreSQL, else None"""
+        if db.engine.dialect.name != "postgresql":
+            return None
+        conn = db.engine.raw_connection().driver_connection
+        conn.autocommit = True
+        conn.cursor().execute(f"LISTEN {BOOKING_CHANNEL}")
+        return conn
+
+    def _run(self, app):
+        with app.app_context():
+            listener = self._listen()
+            if self.last_seq is None:
+                # Start at the head of the outbox; subscribers replay older events via Last-Event-ID
+                self.last_seq = db.session.query(db.func.max(OutboxEvent.seq)).scalar() or 0
+                self._seen.extend(e.seq for e in booking_events(max(self.last_seq - SEQ_OVERLAP, 0), SEQ_OVERLAP))
+            db.session.remove()
+            sources = [self._wake_r] + ([listener] if listener is not None else [])
+            while True:
+                ready, _, _ = select.select(sources, [], [], POLL_SECONDS)
+                if self._wake_r in ready:
+                    os.read(self._wake_r, 4096)
+                if listener is not None and listener in ready:
+                    listener.poll()
+                    listener.notifies.clear()
+                try:
+                    self._dispatch()
+                except Exception:
+                    app.logger.exception("Booking stream dispatch failed")
+                finally:
+                    db.session.remove()
+
+    def _dispatch(self):
+        seen = set(self._seen)
+        for event in booking_events(max(self.last_seq - SEQ_OVERLAP, 0), MAX_BACKLOG):
+            if event.seq in seen:
+                continue
+            self._seen.append(event.seq)
+            self.last_seq = max(self.last_seq, event.seq)
+            message = sse_message(event)
+            with self._lock:
+                subscribers = list(self.subscribers)
+            for sub in subscribers:
+                if not sub.wants(event):
+                    continue
+                try:
+                    sub.queue.put_nowait((event.seq, message))
+                except queue.Full:
+                    # Too slow to keep up; its client reconnects with Last-Event-ID
+                    sub.dropped = True
+                    self.unsubscribe(sub)
+
+
+hub = StreamHub()
+
+
+# The session hands its connection back to the pool once the commit is done,
+# which is when the hub can see the new rows (a rollback only costs a wasted read)
+@event.listens_for(Pool, "checkin")
+def _wake_after_commit(dbapi_connection, connection_record):
+    if connection_record is not None and connection_record.info.pop("booking_changed", False):
+        hub.wake()
@@ -0,0 +1,173 @@
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from models import db, Branch, Booking, Customer, Service, Stylist, Tombstone, stylist_service
+from scheduling import slot_is_free
+from tenancy import current_branch_id
+
+# What a kiosk mirrors: entity name -> (model, columns sent in order)
+SYNC_ENTITIES = {
+    "branches": (Branch, ("id", "name", "address")),
+    "customers": (Customer, ("id", "name", "phone")),
+    "services": (Service, ("id", "title", "description", "price", "duration_minutes", "branch_id")),
+    "stylists": (Stylist, ("id", "name", "bio", "branch_id")),
+    "bookings": (Booking, ("id", "appointment_time", "status", "branch_id", "customer_id",
+                           "stylist_id", "service_id", "client_ref")),
+}
+PUSH_STATUSES = ("pending", "confirmed", "completed", "cancelled")
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _changed(model, since, until, limit):
+    """Rows of ``model`` changed in (since, until], at most ``limit`` plus any sharing the last timestamp"""
+    query = model.query.filter(model.updated_at <= until)
+    if since is not None:
+        query = query.filter(model.updated_at > since)
+    if model is Booking:
+        # Kiosks only keep recent and upcoming appointments
+        days = current_app.config.get("SYNC_HISTORY_DAYS", 7)
+        query = query.filter(Booking.appointment_time >= datetime.utcnow() - timedelta(days=days))
+    rows = query.order_by(model.updated_at, model.id).limit(limit).all()
+    if len(rows) < limit:
+        return rows, None
+    # Take every row stamped with the last timestamp, so the next page can start strictly after it
+    last = rows[-1].updated_at
+    seen = {row.id for row in rows}
+    rows += [row for row in query.filter(model.updated_at == last).all() if row.id not in seen]
+    return rows, last
+
+
+def _deleted(since, until, limit):
+    query = Tombstone.query.filter(Tombstone.deleted_at <= until)
+    if since is not None:
+        query = query.filter(Tombstone.deleted_at > since)
+    branch_id = current_branch_id()
+    if branch_id is not None:
+        query = query.filter(or_(Tombstone.branch_id == branch_id, Tombstone.branch_id.is_(None)))
+    rows = query.order_by(Tombstone.deleted_at, Tombstone.id).limit(limit).all()
+    if len(rows) < limit:
+        return rows, None
+    last = rows[-1].deleted_at
+    seen = {row.id for row in rows}
+    rows += [row for row in query.filter(Tombstone.deleted_at == last).all() if row.id not in seen]
+    return rows, last
+
+
+def pull(since, limit):
+    """Changes after ``since`` as compact column/row arrays, plus the cursor to pull from next.
+
+    Rows newer than SYNC_SETTLE_SECONDS are left for the next pull so a
+    transaction committing an older timestamp late is not skipped. When an
+    entity fills ``limit`` the page stops at its last timestamp and ``more``
+    is set; everything up to the returned ``until`` has been sent.
+    """
+    until = datetime.utcnow() - timedelta(seconds=current_app.config.get("SYNC_SETTLE_SECONDS", 2))
+    if since is not None and since >= until:
+        return {"until": since.isoformat(), "more": False, "changes": {}, "deleted": {}}
+
+    pages = {name: _changed(model, since, until, limit) for name, (model, _) in SYNC_ENTITIES.items()}
+    tombstones, tombstones_cut = _deleted(since, until, limit)
+    cuts = [cut for _, cut in pages.values() if cut is not None]
+    if tombstones_cut is not None:
+        cuts.append(tombstones_cut)
+    if cuts:
+        until = min(cuts)
+
+    changes = {}
+    for name, (rows, _) in pages.items():
+        model, columns = SYNC_ENTITIES[name]
+        rows = [row for row in rows if row.updated_at <= until]
+        if not rows:
+            continue
+        changes[name] = {"columns": list(columns), "rows": [[_value(getattr(row, c)) for c in columns] for row in rows]}
+        if model is Stylist:
+            offered = {}
+            for stylist_id, service_id in db.session.execute(
+                select(stylist_service.c.stylist_id, stylist_service.c.service_id)
+                .where(stylist_service.c.stylist_id.in_([row.id for row in rows]))
+            ):
+                offered.setdefault(stylist_id, []).append(service_id)
+            changes[name]["columns"].append("service_ids")
+            for values in changes[name]["rows"]:
+                values.append(sorted(offered.get(values[0], [])))
+
+    deleted = {}
+    for tombstone in tombstones:
+        if tombstone.deleted_at <= until:
+            deleted.setdefault(tombstone.entity, []).append(tombstone.entity_id)
+
+    return {"until": until.isoformat(), "more": bool(cuts), "changes": changes, "deleted": deleted}
+
+
+def _parse_time(value):
+    """Naive UTC datetime from a kiosk's ISO string, which may carry an offset"""
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _apply_booking(item):
+    """Apply one kiosk booking; returns the per-item result"""
+    if not isinstance(item, dict):
+        return {"client_ref": None, "result": "rejected", "reason": "Each booking must be an object"}
+    ref = item.get("client_ref")
+    if not ref:
+        return {"client_ref": ref, "result": "rejected", "reason": "client_ref is required"}
+    try:
+        start = _parse_time(item["appointment_time"])
+        changed_at = _parse_time(item["updated_at"]) if item.get("updated_at") else datetime.utcnow()
+    except (KeyError, TypeError, ValueError):
+        return {"client_ref": ref, "result": "rejected", "reason": "Invalid datetime format. Use ISO format."}
+    status = item.get("status", "pending")
+    if status not in PUSH_STATUSES:
+        return {"client_ref": ref, "result": "rejected", "reason": f"Unknown status '{status}'"}
+
+    booking = Booking.query.filter_by(client_ref=ref).first()
+    if booking is not None:
+        # Last writer wins; the kiosk's copy only replaces a row it is newer than
+        if changed_at <= booking.updated_at:
+            return {"client_ref": ref, "result": "conflict", "reason": "server_newer", "id": booking.id}
+        if (booking.status != status or booking.appointment_time != start) and status in ("pending", "confirmed"):
+            if not slot_is_free(booking.stylist_id, start, booking.service.duration_minutes, booking.id):
+                return {"client_ref": ref, "result": "conflict", "reason": "slot_taken", "id": booking.id}
+        booking.status = status
+        booking.appointment_time = start
+        return {"client_ref": ref, "result": "updated", "id": booking.id}
+
+    stylist = db.session.get(Stylist, item.get("stylist_id"))
+    service = db.session.get(Service, item.get("service_id"))
+    customer = db.session.get(Customer, item.get("customer_id"))
+    if stylist is None or service is None or customer is None:
+        return {"client_ref": ref, "result": "rejected", "reason": "Unknown customer, stylist or service"}
+    if service not in stylist.services:
+        return {"client_ref": ref, "result": "rejected", "reason": f"Stylist '{stylist.name}' does not offer '{service.title}'"}
+    # Bookings taken online while the kiosk was offline win the slot
+    if status in ("pending", "confirmed") and not slot_is_free(stylist.id, start, service.duration_minutes):
+        return {"client_ref": ref, "result": "conflict", "reason": "slot_taken"}
+
+    booking = Booking(
+        client_ref=ref, customer=customer, stylist=stylist, service=service,
+        appointment_time=start, status=status,
+    )
+    db.session.add(booking)
+    db.session.flush()
+    return {"client_ref": ref, "result": "created", "id": booking.id}
+
+
+def push(bookings):
+    """Apply kiosk-side bookings in order, committing once; returns one result per item"""
+    results = []
+    for item in bookings:
+        try:
+            with db.session.begin_nested():
+                results.append(_apply_booking(item))
+        except IntegrityError:
+            # The same client_ref pushed concurrently by a retrying kiosk
+            results.append({"client_ref": item.get("client_ref"), "result": "conflict", "reason": "duplicate"})
+    db.session.commit()
+    return results
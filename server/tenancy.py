@@ -0,0 +1,37 @@
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+
+BRANCH_HEADER = "X-Branch-ID"
+DEFAULT_BRANCH_ID = 1
+
+
+def current_branch_id():
+    """Branch selected by the current request, or None (all branches)"""
+    return g.get("branch_id") if has_app_context() else None
+
+
+def branch_from_request():
+    """Read the branch from the X-Branch-ID header (or ?branch=); raises ValueError if malformed"""
+    raw = request.headers.get(BRANCH_HEADER) or request.args.get("branch")
+    return int(raw) if raw else None
+
+
+def default_branch_id():
+    """Branch for new stylists/services created outside a branch-scoped request"""
+    return current_branch_id() or DEFAULT_BRANCH_ID
+
+
+class BranchSession(Session):
+    """Session that sends a routed branch's requests to its own database.
+
+    ``BRANCH_BINDS`` maps branch ids to keys of ``SQLALCHEMY_BINDS``; a
+    branch moved to its own database keeps the full schema there, so the
+    whole request (and its transaction) runs against that bind.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            key = current_app.config.get("BRANCH_BINDS", {}).get(current_branch_id())
+            if key is not None:
+                return self._db.engines[key]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,118 @@
+import hashlib
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from flask import current_app
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+THUMBNAIL_SIZES = (160, 480, 1024)
+ORIGINAL_FORMATS = {"JPEG": "jpeg", "PNG": "png", "WEBP": "webp", "GIF": "gif"}
+
+# Names a client may request from the store: "<size>.jpg" or "original.<ext>"
+HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+NAME_RE = re.compile(r"^(\d+\.jpg|original\.(jpeg|png|webp|gif))$")
+
+_pool = None
+
+
+class InvalidImage(ValueError):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def media_root():
+    return current_app.config.get("MEDIA_ROOT") or os.path.join(current_app.instance_path, "media")
+
+
+def media_path(digest, name):
+    """Content-addressed location: <root>/<ab>/<abcdef...>/<name>"""
+    return os.path.join(media_root(), digest[:2], digest, name)
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        # forkserver keeps the renderers free of the web worker's threads and DB connections
+        _pool = ProcessPoolExecutor(
+            max_workers=current_app.config.get("THUMBNAIL_WORKERS"),
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _pool
+
+
+def render_thumbnail(data, size, path):
+    """Write a JPEG fitting in size x size to path (runs in a pool process)"""
+    with Image.open(BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        image.save(tmp, "JPEG", quality=82, optimize=True, progressive=True)
+    os.replace(tmp, path)
+    return path
+
+
+def ingest(data):
+    """Store an uploaded image and its thumbnails; return (digest, original name).
+
+    Identical uploads hash to the same directory, so re-uploads only render
+    sizes that are missing.
+    """
+    try:
+        with Image.open(BytesIO(data)) as image:
+            fmt = image.format
+            image.verify()
+    except Image.DecompressionBombError:
+        raise InvalidImage("Image dimensions are too large", 413)
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise InvalidImage("Upload is not a readable image")
+    if fmt not in ORIGINAL_FORMATS:
+        raise InvalidImage(f"Unsupported image format {fmt}")
+
+    digest = hashlib.sha256(data).hexdigest()
+    original = f"original.{ORIGINAL_FORMATS[fmt]}"
+    path = media_path(digest, original)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    pending = [
+        _executor().submit(render_thumbnail, data, size, media_path(digest, f"{size}.jpg"))
+        for size in THUMBNAIL_SIZES
+        if not os.path.exists(media_path(digest, f"{size}.jpg"))
+    ]
+    try:
+        for future in pending:
+            future.result(timeout=current_app.config.get("THUMBNAIL_TIMEOUT", 30))
+    except BrokenProcessPool:
+        # A renderer died (e.g. OOM on a huge image); start a fresh pool next time
+        global _pool
+        _pool = None
+        raise
+    except FutureTimeout:  # an OSError on Python 3.11+, so caught first
+        for future in pending:
+            future.cancel()
+        raise InvalidImage("Image took too long to process", 413)
+    except Image.DecompressionBombError:
+        raise InvalidImage("Image dimensions are too large", 413)
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        raise InvalidImage("Upload is not a readable image")
+
+    # Only kept once every size rendered, so failed uploads leave no original behind
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+    return digest, original
+
+
+def media_url(digest, name):
+    return f"/media/{digest}/{name}"
+
+
+def thumbnail_urls(digest):
+    return {str(size): media_url(digest, f"{size}.jpg") for size in THUMBNAIL_SIZES}
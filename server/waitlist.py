@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select, update
+from models import db, Booking, Notification, Service, WaitlistEntry, stylist_service
+from scheduling import slot_is_free
+
+
+def hold_duration():
+    return timedelta(minutes=current_app.config.get("WAITLIST_HOLD_MINUTES", 15))
+
+
+def _oldest_waiting(criteria, stylist_id, start, minutes):
+    """Oldest waiting entry matching ``criteria`` whose window contains ``start``"""
+    query = (
+        select(WaitlistEntry)
+        .join(Service, Service.id == WaitlistEntry.service_id)
+        .join(stylist_service, (stylist_service.c.service_id == WaitlistEntry.service_id)
+              & (stylist_service.c.stylist_id == stylist_id))
+        .where(
+            criteria,
+            WaitlistEntry.status == "waiting",
+            WaitlistEntry.window_start <= start,
+            WaitlistEntry.window_end >= start,
+            Service.duration_minutes <= minutes,
+        )
+        .order_by(WaitlistEntry.created_at, WaitlistEntry.id)
+        .limit(1)
+    )
+    if db.engine.dialect.name == "postgresql":
+        # Concurrent matchers for the same stylist skip each other's candidates
+        query = query.with_for_update(of=WaitlistEntry, skip_locked=True)
+    return db.session.scalars(query).first()
+
+
+def offer_freed_slot(stylist_id, start, minutes):
+    """Offer a freed slot to the longest-waiting customer that fits it.
+
+    Candidates come from two indexed lookups (entries for this stylist, and
+    "any stylist" entries for services the stylist offers) instead of a scan
+    of the whole waitlist. Returns the offered entry or None.
+    """
+    if start <= datetime.utcnow():
+        return None
+    specific = _oldest_waiting(WaitlistEntry.stylist_id == stylist_id, stylist_id, start, minutes)
+    anyone = _oldest_waiting(WaitlistEntry.stylist_id.is_(None), stylist_id, start, minutes)
+    entries = [e for e in (specific, anyone) if e is not None]
+    if not entries:
+        return None
+    entry = min(entries, key=lambda e: (e.created_at, e.id))
+
+    entry.status = "offered"
+    entry.offered_stylist_id = stylist_id
+    entry.offered_time = start
+    entry.offer_expires_at = datetime.utcnow() + hold_duration()
+    db.session.add(Notification(
+        customer_id=entry.customer_id,
+        type="offer",
+        message=(
+            f"A slot opened on {start:%Y-%m-%d %H:%M} for {entry.service.title}. "
+            f"Confirm before {entry.offer_expires_at:%H:%M} UTC to book it."
+        ),
+    ))
+    db.session.commit()
+    return entry
+
+
+def offer_booking_slot(stylist_id, service_id, start):
+    """Hand the slot of a cancelled/deleted booking to the waitlist"""
+    minutes = db.session.scalar(select(Service.duration_minutes).where(Service.id == service_id))
+    if minutes is not None:
+        offer_freed_slot(stylist_id, start, minutes)
+
+
+def release_expired_offers():
+    """Expire unanswered offers (passing their slots on) and waiting entries whose window has passed.
+
+    Returns (offers expired, waiting entries expired).
+    """
+    now = datetime.utcnow()
+    # Past windows can never be offered a slot; left waiting they only lengthen the matcher's index scans
+    lapsed = db.session.execute(
+        update(WaitlistEntry)
+        .where(WaitlistEntry.status == "waiting", WaitlistEntry.window_end < now)
+        .values(status="expired")
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    expired = WaitlistEntry.query.filter(
+        WaitlistEntry.status == "offered",
+        WaitlistEntry.offer_expires_at < now,
+    ).all()
+    slots = []
+    for entry in expired:
+        entry.status = "expired"
+        slots.append((entry.offered_stylist_id, entry.offered_time, entry.service.duration_minutes))
+    db.session.commit()
+    for stylist_id, start, minutes in slots:
+        offer_freed_slot(stylist_id, start, minutes)
+    return len(expired), lapsed
+
+
+def accept_offer(entry):
+    """Book an offered slot; returns the booking or an error message"""
+    if entry.status != "offered":
+        return None, "No open offer for this entry"
+    if entry.offer_expires_at < datetime.utcnow():
+        return None, "Offer has expired"
+    if not slot_is_free(entry.offered_stylist_id, entry.offered_time, entry.service.duration_minutes):
+        entry.status = "expired"
+        db.session.commit()
+        return None, "Slot is no longer available"
+
+    booking = Booking(
+        customer_id=entry.customer_id,
+        stylist_id=entry.offered_stylist_id,
+        service_id=entry.service_id,
+        appointment_time=entry.offered_time,
+        status="confirmed",
+    )
+    db.session.add(booking)
+    db.session.flush()
+    entry.status = "booked"
+    entry.booking_id = booking.id
+    db.session.commit()
+    return booking, None